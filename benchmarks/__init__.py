@@ -0,0 +1 @@
+# benchmarks of the package : python -m benchmarks --help
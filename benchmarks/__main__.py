@@ -0,0 +1,44 @@
+# command line entry point of the benchmarks : python -m benchmarks [--output report.json] [--baseline old.json]
+import argparse
+import sys
+from benchmarks.cases import cases
+from benchmarks.harness import run_benchmarks, save_report, load_report, compare, print_comparison
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Times the operations of the graphs and circuits")
+    parser.add_argument("cases", nargs="*", metavar="case", help=f"cases to run among {', '.join(cases)} (all by default)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 256, 1024], help="sizes given to every case")
+    parser.add_argument("--quick", action="store_true", help="small sizes and a single run, to check that everything works")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every case, the best one is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="writes the json report to this file")
+    parser.add_argument("--baseline", help="json report of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative difference considered as noise")
+    parser.add_argument("--fail-slower", action="store_true", help="exits with status 1 if a case is slower than the baseline")
+    parser.add_argument("--list", action="store_true", help="lists the cases and the meaning of their size")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (_, description) in cases.items():
+            print(f"{name:<18} {description}")
+        return 0
+    for name in args.cases:
+        if name not in cases:
+            parser.error(f"unknown case {name}")
+    sizes, repeat = ((16, 64), 1) if args.quick else (tuple(args.sizes), args.repeat)
+    baseline = load_report(args.baseline) if args.baseline else None   #read before running to fail early
+
+    report = run_benchmarks(args.cases or None, sizes, repeat, args.seed, verbose=baseline is None)
+    status = 0
+    if baseline is not None:
+        slower, faster = compare(report, baseline, args.tolerance)
+        print_comparison(report)
+        print(f"{len(slower)} slower, {len(faster)} faster, tolerance {args.tolerance:.0%}")
+        if slower and args.fail_slower:
+            status = 1
+    if args.output:
+        save_report(report, args.output)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import os
+import random
+import tempfile
+from modules.open_digraph import open_digraph
+from modules.bool_circ import bool_circ
+from modules.adders import adders
+
+# Every case is a function of the size n that prepares its data and returns the function that is timed,
+# so that only the operation itself is measured. The random module is seeded before the preparation.
+
+
+###Graphs
+
+def random_dag(n, degree=2):
+    '''
+        draws the edges of a sparse acyclic graph : about degree edges per node, oriented along a random order
+
+        Parameters:
+        -----------
+        n (int) : number of nodes
+        degree (int) default=2 : number of edges drawn for every node
+
+        Returns:
+        --------
+        the list of edges (i,j) between the integers of range(n) and the random order of the nodes
+    '''
+    order = list(range(n))
+    random.shuffle(order)
+    rank = {i: r for r, i in enumerate(order)}
+    edges = []
+    for i in range(n):
+        for _ in range(degree):
+            j = random.randrange(n)
+            if rank[i] < rank[j]:
+                edges.append((i, j))
+            elif rank[j] < rank[i]:
+                edges.append((j, i))
+    return edges, order
+
+def build_graph(n, edges, inputs=(), outputs=()):
+    '''
+        builds the graph of random_dag with add_node and add_edge, inputs and outputs being linked to the
+        nodes of range(n) given in the lists inputs and outputs
+    '''
+    g = open_digraph.empty()
+    ids = [g.add_node() for _ in range(n)]
+    for src, tgt in edges:
+        g.add_edge(ids[src], ids[tgt])
+    for i in inputs:
+        g.add_input_node(ids[i])
+    for o in outputs:
+        g.add_output_node(ids[o])
+    return g
+
+def random_graph(n, ports=0):
+    '''
+        returns a sparse acyclic graph of n nodes with ports inputs on its first nodes and ports outputs on its last ones
+    '''
+    edges, order = random_dag(n)
+    return build_graph(n, edges, order[:ports], order[len(order)-ports:])
+
+workspace = None   #the temporary directory of the files written by the cases, removed at exit
+
+def temporary_path(name):
+    '''
+        returns the path of a file in the temporary directory shared by all the cases and runs
+    '''
+    global workspace
+    if workspace is None:
+        workspace = tempfile.TemporaryDirectory(prefix="benchmarks-")
+    return os.path.join(workspace.name, name)
+
+def adder_register(width):
+    '''
+        returns the adder of width bits (rounded down to a power of two) whose inputs are given random constants,
+        as in addition_checkEncode.add_registre_naive
+    '''
+    n = max(width, 2).bit_length() - 1
+    circuit = adders.adder(n)
+    circuit.icompose(bool_circ.create_registre(random.getrandbits(2*2**n + 1), size=2*2**n + 1))
+    return circuit
+
+
+###Cases
+
+def case_random(n):
+    return lambda: open_digraph.random(n, form="DAG")
+
+def case_build(n):
+    edges, order = random_dag(n)
+    return lambda: build_graph(n, edges)
+
+def case_iparallel(n):
+    g, h = random_graph(n, n//8), random_graph(n, n//8)
+    return lambda: g.iparallel(h)
+
+def case_icompose(n):
+    g, f = random_graph(n, n//8), random_graph(n, n//8)
+    return lambda: g.icompose(f)
+
+def case_dijkstra(n):
+    g = random_graph(n, 1)
+    return lambda: g.dijkstra(g.get_inputs_ids()[0])
+
+def case_topological_sort(n):
+    g = random_graph(n)
+    return lambda: g.topological_sort()
+
+def case_transform_circuit(n):
+    circuit = adder_register(n)
+    return circuit.transform_circuit
+
+def case_evaluate(n):
+    circuit = adder_register(n)
+    return circuit.evaluate
+
+def case_evaluate_compiled(n):
+    circuit = adders.adder(max(n, 2).bit_length() - 1)
+    bits = [random.randint(0, 1) for _ in circuit.get_inputs_ids()]
+    return lambda: circuit.evaluate(bits)
+
+def case_adder(n):
+    adders.templates.clear()   #the circuit is built, not copied from the cache
+    return lambda: adders.adder(max(n, 2).bit_length() - 1)
+
+def case_CLA_adder(n):
+    adders.templates.clear()
+    return lambda: adders.CLA_adder(max(n//4 - 1, 0))
+
+def case_save_dot(n):
+    g = random_graph(n, n//8)
+    path = temporary_path("graph.dot")
+    return lambda: g.save_as_dot_file(path)
+
+def case_load_dot(n):
+    path = temporary_path("graph.dot")
+    random_graph(n, n//8).save_as_dot_file(path)
+    return lambda: open_digraph.from_dot_file(path)
+
+# the cases in the order in which they are run, with the meaning of the size n
+cases = {
+    "random" : (case_random, "open_digraph.random of n nodes (dense acyclic graph)"),
+    "build" : (case_build, "n add_node and about 2n add_edge"),
+    "iparallel" : (case_iparallel, "iparallel of two graphs of n nodes"),
+    "icompose" : (case_icompose, "icompose of two graphs of n nodes with n/8 ports"),
+    "dijkstra" : (case_dijkstra, "dijkstra from an input of a graph of n nodes"),
+    "topological_sort" : (case_topological_sort, "topological_sort of a graph of n nodes"),
+    "transform_circuit" : (case_transform_circuit, "transform_circuit of an adder of n bits with constant inputs"),
+    "evaluate" : (case_evaluate, "evaluate of an adder of n bits with constant inputs"),
+    "evaluate_compiled" : (case_evaluate_compiled, "evaluate(inputs) of an adder of n bits, compilation included"),
+    "adder" : (case_adder, "adders.adder of n bits, built without the template cache"),
+    "CLA_adder" : (case_CLA_adder, "adders.CLA_adder of n bits, built without the template cache"),
+    "save_dot" : (case_save_dot, "save_as_dot_file of a graph of n nodes"),
+    "load_dot" : (case_load_dot, "from_dot_file of a graph of n nodes"),
+}
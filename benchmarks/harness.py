@@ -0,0 +1,161 @@
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from benchmarks.cases import cases
+
+FORMAT = 1   #version of the json reports, increased when their structure changes
+
+
+###Measures
+
+def time_run(run, repeat=3, warmup=1):
+    '''
+        times a function without argument, the garbage collector being disabled during every run
+
+        Parameters:
+        -----------
+        run (function) : the function timed
+
+        Optional:
+        repeat (int) default=3 : the number of timed runs
+        warmup (int) default=1 : the number of runs before, which are not timed
+
+        Returns:
+        --------
+        the list of the durations of the runs in seconds, of which the best one is usually kept
+    '''
+    for _ in range(warmup):
+        run()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()   #a collection triggered by the preparation must not be paid by the run
+        try:
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return times
+
+def time_case(name, n, repeat=3, seed=0, warmup=1):
+    '''
+        times a case of benchmarks.cases, its data being prepared again before every run
+
+        Parameters:
+        -----------
+        name (str) : the name of the case in cases
+        n (int) : the size given to the case
+
+        Optional:
+        repeat (int) default=3 : the number of runs
+        seed (int) default=0 : the seed of the random module, the same for every run so that they all
+                               work on the same data
+        warmup (int) default=1 : the number of runs that are not timed, for the lazy imports of the package
+
+        Returns:
+        --------
+        the list of the durations of the runs in seconds
+    '''
+    make, _ = cases[name]
+    times = []
+    for k in range(warmup + repeat):
+        random.seed(seed)
+        run = make(n)
+        if k < warmup:
+            run()
+        else:
+            times += time_run(run, 1, 0)
+    return times
+
+def run_benchmarks(names=None, sizes=(64, 256, 1024), repeat=3, seed=0, verbose=True):
+    '''
+        times every case on every size
+
+        Parameters:
+        -----------
+        Optional:
+        names (str list) default=None : the cases run, all the cases of benchmarks.cases if None
+        sizes (int tuple) default=(64,256,1024) : the sizes given to every case
+        repeat (int) default=3 : the number of runs of every case and size, the best one is kept
+        seed (int) default=0 : the seed of the random module
+        verbose (bool) default=True : prints every result as soon as it is measured
+
+        Returns:
+        --------
+        the report (dict) : the conditions of the measures and the list of its results, one dict per case and size
+    '''
+    names = list(cases) if names is None else names
+    for name in names:
+        assert name in cases, f"Unknown benchmark {name}."
+    results = []
+    for name in names:
+        for n in sizes:
+            times = time_case(name, n, repeat, seed)
+            results.append({"case" : name, "size" : n, "best" : min(times),
+                            "median" : statistics.median(times), "times" : times})
+            if verbose:
+                print(f"{name:<18} {n:>7}  {min(times)*1000:>10.3f} ms")
+    return {"format" : FORMAT, "python" : sys.version.split()[0], "platform" : platform.platform(),
+            "seed" : seed, "repeat" : repeat, "sizes" : list(sizes), "results" : results}
+
+
+###Reports
+
+def save_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def load_report(path):
+    with open(path) as f:
+        report = json.load(f)
+    assert report.get("format") == FORMAT, f"{path} is not a benchmark report of format {FORMAT}."
+    return report
+
+def compare(report, baseline, tolerance=0.1):
+    '''
+        compares the best times of a report with the ones of a baseline report
+
+        Every result measured in both reports gets the best time of the baseline and the ratio of the two
+        (above 1 when the report is slower), the results of the report are modified inplace.
+
+        Parameters:
+        -----------
+        report (dict) : the report of run_benchmarks
+        baseline (dict) : the report it is compared to
+
+        Optional:
+        tolerance (float) default=0.1 : the relative difference under which a result is considered unchanged
+
+        Returns:
+        --------
+        the lists of the results that are slower and faster than the baseline
+    '''
+    base = {(r["case"], r["size"]) : r["best"] for r in baseline["results"]}
+    slower, faster = [], []
+    for r in report["results"]:
+        key = (r["case"], r["size"])
+        if key not in base:
+            continue
+        r["baseline"] = base[key]
+        r["ratio"] = r["best"] / base[key] if base[key] > 0 else float("inf")
+        if r["ratio"] > 1 + tolerance:
+            slower.append(r)
+        elif r["ratio"] < 1 / (1 + tolerance):
+            faster.append(r)
+    return slower, faster
+
+def print_comparison(report):
+    '''
+        prints the results of a report compared to its baseline (see compare)
+    '''
+    for r in report["results"]:
+        if "ratio" in r:
+            print(f"{r['case']:<18} {r['size']:>7}  {r['baseline']*1000:>10.3f} ms -> {r['best']*1000:>10.3f} ms"
+                  f"  x{r['ratio']:.2f}")
+        else:
+            print(f"{r['case']:<18} {r['size']:>7}  {'':>13}    {r['best']*1000:>10.3f} ms  (no baseline)")
@@ -1,2 +1 @@
 # modules/__init__.py
-print("Initializing the modules package...")
@@ -0,0 +1,29 @@
+# command line entry point of the package : python -m modules <command>
+import argparse
+from modules.addition_checkEncode import check_invarients, print_stats, benchmark_adders, measure_import_time
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules", description="Demonstrations and measures of the boolean circuits")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("invariants", help="checks the Hamming encoder and decoder")
+    commands.add_parser("stats", help="statistics of the simplification of 1000 random circuits")
+    bench = commands.add_parser("benchmark-adders", help="compares the gates, depth and throughput of the adders")
+    bench.add_argument("--widths", type=int, nargs="+", default=[8, 16, 32, 64])
+    bench.add_argument("--repeat", type=int, default=5, help="evaluations timed, the best one is kept")
+    imp = commands.add_parser("import-time", help="measures the cold-start import time of a module of the package")
+    imp.add_argument("--module", default="modules.addition_checkEncode")
+    imp.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "invariants":
+        check_invarients()
+    elif args.command == "stats":
+        print_stats()
+    elif args.command == "benchmark-adders":
+        benchmark_adders(tuple(args.widths), repeat=args.repeat)
+    else:
+        seconds, heavy = measure_import_time(args.module, args.repeat)
+        print(f"import {args.module} : {seconds*1000:.1f} ms" + (f", loads {', '.join(heavy)}" if heavy else ""))
+
+if __name__ == "__main__":
+    main()
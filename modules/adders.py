@@ -1,17 +1,20 @@
-import os
-import sys
-sys.path[0] = os.path.abspath(os.path.join(sys.path[0], '..'))
 from modules.bool_circ import bool_circ
+from modules.hier_circ import hier_circ
 
 class adders(bool_circ):
+    
+    templates = {}            #(class, name, n) -> the circuit returned by adder, half_adder, CLA_adder or prefix_adder, see template
+    compiled_templates = {}   #(class, name, n) -> its compiled_circ, see compiled
+    
     @classmethod
-    def adder_helper(cls,n):
+    def adder_helper(cls,n,base=0):
         '''
             auxiliary function that helps create the adder recursively
 
             Parameters:
             -----------
             n (int) : represent which level of adder wanted; Adder_n.
+            base (int) default=0 : the smallest id of the circuit, its ids are the integers from base to base+size-1
             
             Returns:
             --------
@@ -35,15 +38,39 @@ class adders(bool_circ):
             out2 =  circuit.add_copy_node({nor2:1},{})
             circuit.set_inputs([inp1,inp2,carry_in])
             circuit.set_outputs([carry_out,out2])
-            return circuit,carry_in,carry_out
+            circuit.shift_indices(base)
+            return circuit,carry_in+base,carry_out+base
         else:
-            adder_1,carry_in1,carry_out1 = cls.adder_helper(n-1)
-            adder_2,carry_in2,carry_out2 = cls.adder_helper(n-1)
-            n = adder_1.iparallel(adder_2)
-            adder_1.add_edge(carry_out1+n,carry_in2)
-            adder_1.get_inputs_ids().remove(carry_in2)
-            adder_1.get_outputs_ids().remove(carry_out1+n)
-            return adder_1,carry_in1+n,carry_out2
+            module,carry_in,carry_out = cls.adder_module(n)
+            circuit = module.flatten(base)
+            return circuit,circuit.get_inputs_ids()[carry_in],circuit.get_outputs_ids()[carry_out]
+
+    @classmethod
+    def adder_module(cls,n):
+        '''
+            creates adder_n as a hierarchical circuit : the two halves of every level are two instances
+            of the same module, so only n+1 distinct modules are built whatever the size of the adder
+
+            Parameters:
+            -----------
+            n (int) : represent which level of adder wanted; Adder_n.
+
+            Returns:
+            --------
+            a tuple of adder_n circuit (hier_circ), index of the carry in among its inputs (int),
+            index of the carry out among its outputs (int)
+        '''
+        circuit,carry_in,carry_out = cls.adder_helper(0)
+        module = hier_circ([circuit],[],[(0,j) for j in range(3)],[(0,i) for i in range(2)])
+        carry_in,carry_out = circuit.get_inputs_ids().index(carry_in),circuit.get_outputs_ids().index(carry_out)
+        for _ in range(n):
+            nb_in,nb_out = hier_circ.ports(module)
+            #the instance 0 is the lower half (smaller ids), its carry in is linked to the carry out of the instance 1
+            module = hier_circ([module,module],[((1,carry_out),(0,carry_in))],
+                               [(1,j) for j in range(nb_in)] + [(0,j) for j in range(nb_in) if j != carry_in],
+                               [(1,i) for i in range(nb_out) if i != carry_out] + [(0,i) for i in range(nb_out)])
+            carry_out = nb_out-1 + carry_out
+        return module,carry_in,carry_out
     
     @classmethod
     def adder(cls,n):
@@ -58,10 +85,7 @@ class adders(bool_circ):
             --------
             adder_n circuit (adders)
         '''
-        add,cin,cout = cls.adder_helper(n)
-        add.get_inputs_ids().sort()
-        add.get_outputs_ids().sort()
-        return add
+        return cls.template("adder",n).copy()
 
     @classmethod
     def half_adder(cls,n):
@@ -76,9 +100,8 @@ class adders(bool_circ):
             --------
             half_adder_n circuit (adders)
         '''
-        add,cin,cout = cls.adder_helper(n)
-        add.get_node_by_id(cin).set_label("0")
-        return add,cin
+        add,cin = cls.template("half_adder",n)
+        return add.copy(),cin
     
     @classmethod
     def CL_4bit(cls):
@@ -158,13 +181,14 @@ class adders(bool_circ):
         return circuit
     
     @classmethod
-    def CLA_helper(cls,n):
+    def CLA_helper(cls,n,base=0):
         '''
             auxiliary function that helps create the CLA_adder recursively
 
             Parameters:
             -----------
             n (int) : represent which level of adder wanted; CLA_adder_n.
+            base (int) default=0 : the smallest id of the circuit, as in adder_helper
             
             Returns:
             --------
@@ -172,15 +196,40 @@ class adders(bool_circ):
         '''
         if (n==0):
             g = cls.CLA_4bit()
-            return 65,g,70
+            g.shift_indices(base)
+            return 65+base,g,70+base
         else :
-            cout1,CLA1,cin1 = cls.CLA_helper(0)
-            cout2,CLA2,cin2 = cls.CLA_helper(n-1)
-            n = CLA1.iparallel(CLA2)
-            CLA1.add_edge(cout1+n,cin2)
-            CLA1.get_inputs_ids().remove(cin2)
-            CLA1.get_outputs_ids().remove(cout1+n)
-            return cout2,CLA1,cin1+n
+            module,cout,cin = cls.CLA_module(n)
+            circuit = module.flatten(base)
+            return circuit.get_outputs_ids()[cout],circuit,circuit.get_inputs_ids()[cin]
+
+    @classmethod
+    def CLA_module(cls,n):
+        '''
+            creates CLA_adder_n as a hierarchical circuit : a single CLA_4bit block is instantiated n+1 times
+
+            Parameters:
+            -----------
+            n (int) : represent which level of adder wanted; CLA_adder_n.
+
+            Returns:
+            --------
+            a tuple of CLA_adder_n circuit (hier_circ), index of the carry out among its outputs (int),
+            index of the carry in among its inputs (int)
+        '''
+        cout,block,cin = cls.CLA_helper(0)
+        nb_in,nb_out = hier_circ.ports(block)
+        cout,cin = block.get_outputs_ids().index(cout),block.get_inputs_ids().index(cin)
+        module = hier_circ([block],[],[(0,j) for j in range(nb_in)],[(0,i) for i in range(nb_out)])
+        module_cout = cout
+        for _ in range(n):
+            nb_module_in,nb_module_out = hier_circ.ports(module)
+            #the instance 0 is the rest of the adder (smaller ids), its carry in is linked to the carry out of the new block
+            module = hier_circ([module,block],[((1,cout),(0,cin))],
+                               [(1,j) for j in range(nb_in)] + [(0,j) for j in range(nb_module_in) if j != cin],
+                               [(1,i) for i in range(nb_out) if i != cout] + [(0,i) for i in range(nb_module_out)])
+            module_cout = nb_out-1 + module_cout
+        return module,module_cout,cin
         
     @classmethod
     def CLA_adder(cls,n):
@@ -195,5 +244,163 @@ class adders(bool_circ):
             --------
             CLA_adder_n circuit (adders)
         '''
-        cout,cla,cin = cls.CLA_helper(n)
-        return cla
\ No newline at end of file
+        return cls.template("CLA_adder",n).copy()
+
+    @classmethod
+    def template(cls,name,n):
+        '''
+            Returns the circuit returned by adder, half_adder or CLA_adder for n (or by prefix_adder for
+            the width n if name is one of prefix_networks), built the first time only
+            
+            The circuit is shared by all the calls : it must be copied, never modified.
+
+            Parameters:
+            -----------
+            name (str) : "adder", "half_adder", "CLA_adder" or a network of prefix_networks
+            n (int) : represent which level of adder wanted (its width for a prefix adder)
+            
+            Returns:
+            --------
+            the circuit (adders), with its carry in id for "half_adder"
+        '''
+        key = (cls,name,n)
+        if key not in adders.templates:
+            if name == "adder":
+                circuit,cin,cout = cls.adder_helper(n)
+                circuit.get_inputs_ids().sort()
+                circuit.get_outputs_ids().sort()
+                template = circuit
+            elif name == "half_adder":
+                circuit,cin,cout = cls.adder_helper(n)
+                circuit.relabel(cin,"0")
+                template = (circuit,cin)
+            elif name in cls.prefix_networks:
+                circuit = template = cls.prefix_adder_helper(n,name)
+            else:
+                cout,circuit,cin = cls.CLA_helper(n)
+                template = circuit
+            circuit.is_well_formed()   #the violations are computed once and inherited by the copies
+            adders.templates[key] = template
+        return adders.templates[key]
+
+    @classmethod
+    def compiled(cls,name,n):
+        '''
+            Returns the compiled template (see template), compiled the first time only, 
+            its outputs are in increasing order of ids like the result of evaluate
+
+            Parameters:
+            -----------
+            name (str) : as in template
+            n (int) : as in template
+            
+            Returns:
+            --------
+            compiled_circ
+        '''
+        key = (cls,name,n)
+        if key not in adders.compiled_templates:
+            template = cls.template(name,n)
+            circuit = (template[0] if name == "half_adder" else template).copy()
+            circuit.get_outputs_ids().sort()
+            adders.compiled_templates[key] = circuit.compile()
+        return adders.compiled_templates[key]
+
+    prefix_networks = ("kogge_stone", "brent_kung", "sklansky")
+
+    @classmethod
+    def prefix_adder_helper(cls,width,network):
+        '''
+            creates a parallel-prefix adder : the carries are the prefixes of the (generate, propagate) couples
+            of the bits for the operator (G,P)o(G',P') = (G | P&G', P&P'), computed by a network of depth log(width)
+
+            Parameters:
+            -----------
+            width (int) : the number of bits of the operands, any positive integer
+            network (str) : the prefix network, one of prefix_networks
+                            "kogge_stone" : depth log(width), one operator per bit and per level
+                            "brent_kung" : depth 2log(width), about 2*width operators
+                            "sklansky" : depth log(width), width/2 operators per level with a large fanout
+            
+            Returns:
+            --------
+            the circuit (adders), its inputs and outputs are in the order of the ones of adder : the bits of b and a
+            interleaved from the most significant one then the carry in / the carry out then the sum from the most
+            significant bit
+        '''
+        assert network in cls.prefix_networks, f"unknown prefix network {network}"
+        circuit = cls.empty_bool_circ()
+        
+        def signal(gate):   #copy node propagating the value of gate to any number of gates
+            return circuit.add_copy_node({gate:1},{})
+        
+        def combine(high,low):   #P is None for the groups starting at the carry in, it would be 0 and is never used
+            g = signal(circuit.add_or_node({high[0]:1,circuit.add_and_node({high[1]:1,low[0]:1},{}):1},{}))
+            p = None if low[1] is None else signal(circuit.add_and_node({high[1]:1,low[1]:1},{}))
+            return (g,p)
+        
+        #inputs, in the order of the inputs of adder
+        inputs = []
+        a,b = [None]*width,[None]*width
+        for i in range(width-1,-1,-1):
+            for bits in (b,a):
+                inputs.append(circuit.add_copy_node())
+                bits[i] = circuit.add_copy_node({inputs[-1]:1},{})
+        inputs.append(circuit.add_copy_node())
+        carry_in = circuit.add_copy_node({inputs[-1]:1},{})
+        
+        #groups[j] covers the bits j-1 down to the carry in (the position 0) once the network is done
+        propagate = [signal(circuit.add_xor_node({a[i]:1,b[i]:1},{})) for i in range(width)]
+        groups = [(carry_in,None)] + [(signal(circuit.add_and_node({a[i]:1,b[i]:1},{})),propagate[i]) for i in range(width)]
+        n = width+1
+        d = 1
+        if network == "kogge_stone":
+            while d < n:
+                groups = [combine(groups[j],groups[j-d]) if j >= d else groups[j] for j in range(n)]
+                d *= 2
+        elif network == "sklansky":
+            while d < n:   #the upper half of every block of 2d positions is combined with the last group of the lower half
+                groups = [combine(groups[j],groups[(j//(2*d))*2*d+d-1]) if j & d else groups[j] for j in range(n)]
+                d *= 2
+        else:
+            while d < n:   #up-sweep : the group of every block of 2d positions
+                for j in range(2*d-1,n,2*d):
+                    groups[j] = combine(groups[j],groups[j-d])
+                d *= 2
+            while d > 1:   #down-sweep : the positions between the blocks
+                d //= 2
+                for j in range(3*d-1,n,2*d):
+                    groups[j] = combine(groups[j],groups[j-d])
+        
+        #outputs : the carry out then the sum bits
+        outputs = [circuit.add_copy_node({groups[width][0]:1},{})]
+        for i in range(width-1,-1,-1):
+            outputs.append(circuit.add_copy_node({circuit.add_xor_node({propagate[i]:1,groups[i][0]:1},{}):1},{}))
+        circuit.set_inputs(inputs)
+        circuit.set_outputs(outputs)
+        
+        #removing the propagate couples computed by the network but never used
+        dead = [node_id for node_id,nnode in circuit.get_id_node_map().items() if nnode.get_children() == {} and node_id not in circuit.get_outputs_ids()]
+        while dead != []:
+            node_id = dead.pop()
+            parents = list(circuit.get_node_by_id(node_id).get_parents())
+            circuit.remove_node_by_id(node_id)
+            dead += [p for p in parents if circuit.get_node_by_id(p).get_children() == {}]
+        return circuit
+
+    @classmethod
+    def prefix_adder(cls,width,network="kogge_stone"):
+        '''
+            creates a parallel-prefix adder of width bits (see prefix_adder_helper), built once per width and network
+
+            Parameters:
+            -----------
+            width (int) : the number of bits of the operands
+            network (str) default="kogge_stone" : "kogge_stone", "brent_kung" or "sklansky"
+            
+            Returns:
+            --------
+            the circuit (adders)
+        '''
+        return cls.template(network,width).copy()
+
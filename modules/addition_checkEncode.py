@@ -1,10 +1,9 @@
 import os
 import sys
-sys.path[0] = os.path.abspath(os.path.join(sys.path[0], '..'))
+import subprocess
 from modules.adders import adders
 from modules.bool_circ import *
 import random 
-import numpy as np
 
 def find_bigger_2_pow(n):
     acc = 1
@@ -37,10 +36,8 @@ def add_registre_naive(a,b, size=8):
         res +=   b_str[i]+a_str[i]
     res = res + "0" # adding 0 carry bit
     
-    g = adders.adder(n)
-    registre = bool_circ.create_registre(int(res , 2),size=2*reg_size+1)
-    g.icompose(registre)
-    return g.calculate()
+    #the adder is built and compiled once per size
+    return bool_circ.convert_bits_to_int(adders.compiled("adder",n).evaluate(res))
 
 def add_registre_naive_half(a,b, size=8):
     """
@@ -66,14 +63,11 @@ def add_registre_naive_half(a,b, size=8):
     res = res[::-1]
     
 
-    g,cin = adders.half_adder(n)
-    g.get_inputs_ids().remove(cin)
-    #We remove the carry bit so that it wont be affected by icompose
-    registre = bool_circ.create_registre(int(res , 2),size=2*reg_size)
-    n = g.icompose(registre)
-    g.display_graph("test2",verbose=True)
-    g.get_inputs_ids().append(cin+n) #we put him back in for evaluatio
-    return g.calculate()
+    g,cin = adders.template("half_adder",n)
+    #the bits of the register go to the inputs other than the carry bit, which stays 0
+    bits = list(res)
+    bits.insert(g.get_inputs_ids().index(cin),"0")
+    return bool_circ.convert_bits_to_int(adders.compiled("half_adder",n).evaluate(bits))
 
 def add_naive(a,b):
     """
@@ -109,10 +103,9 @@ def add_registre_CLA(a,b, size=8):
         for i in range(size-1,size-remainder-1,-1):
             res+= c[i]
     res = "0"+res  # adding 0 carry bit"
-    g = adders.CLA_adder(quotient-1)
-    registre = bool_circ.create_registre(int(res , 2),size=(quotient)*8+1)
-    g.icompose(registre)
-    return g.calculate()
+    #the bits of the register linked to the inputs of the CLA_adder, which is built and compiled once per size
+    bits = bool_circ.convert_to_binary_string(int(res , 2),size=(quotient)*8+1)
+    return bool_circ.convert_bits_to_int(adders.compiled("CLA_adder",quotient-1).evaluate(bits))
     
 def add_CLA(a,b):
     """
@@ -143,12 +136,12 @@ def check_invarients():
     for i in range(-1,4): #-1 -> no error is introduced
         noise = adders.perturbe_bit(7,[i])  
         g = bool_circ.compose(noise,enc)  #adding perturbations
-        g2 = bool_circ.compose(dec,g)
+        g2 = bool_circ(bool_circ.compose(dec,g))
         
+        #the 16 messages are evaluated at once in a bit-sliced pass
+        results = g2.evaluate_many([bool_circ.convert_to_binary_string(i,size=4) for i in range(0,16)])
         for i in range(0,16):
-            reg = bool_circ.create_registre(i,size=4)
-            g3 = bool_circ(bool_circ.compose(g2,reg))
-            assert (i==g3.calculate())
+            assert (i==bool_circ.convert_bits_to_int(results[i]))
     
     print("Hamming property verfied when introducing one error at most.")
     
@@ -157,11 +150,10 @@ def check_invarients():
         for j in range(i+1,4):
             noise = bool_circ.perturbe_bit(7,[i,j]) 
             g = bool_circ.compose(noise,enc)
-            g2 = bool_circ.compose(dec,g)
+            g2 = bool_circ(bool_circ.compose(dec,g))
+            results = g2.evaluate_many([bool_circ.convert_to_binary_string(k,size=4) for k in range(0,16)])
             for k in range(0,16):
-                reg = bool_circ.create_registre(k,size=4)
-                g3 = bool_circ(bool_circ.compose(g2,reg))
-                mistakes += (i!=g3.calculate())
+                mistakes += (i!=bool_circ.convert_bits_to_int(results[k]))
     print(f"Number of time that the original signal couldn't be retreived when introducing 2 errors: {mistakes} out of {6*16} attempts.")
     
     
@@ -191,6 +183,7 @@ def print_stats():
     vn = 0
     ve = 0
     number_trials = 1000
+    report = None
 
     for i in range(number_trials):
         inputs = random.choice([8,16,32,64])
@@ -200,7 +193,9 @@ def print_stats():
         node_number = len(circuit.get_nodes())
         edges_number = count_edges(circuit)
         
+        report = circuit.start_instrumentation(report)
         circuit.transform_circuit()
+        circuit.stop_instrumentation()
         
         number_left_nodes = len(circuit.get_nodes())
         edges_left = count_edges(circuit)
@@ -211,6 +206,7 @@ def print_stats():
         vn += (node_number - number_left_nodes)**2
         ve += (edges_number - edges_left)**2
 
+    import numpy as np
     moy_n = diff_nodes / number_trials
     moy_e = diff_edges / number_trials
 
@@ -221,7 +217,82 @@ def print_stats():
     print(f"Variance : {var_n}, deviation : {np.sqrt(var_n)}")
     print(f"Average number of removed edges : {moy_e}")
     print(f"Variance : {var_e}, deviation : {np.sqrt(var_e)}")
+    print_rule_report(report)
 
+def print_rule_report(report):
+    '''
+        prints the counters of the simplification rules recorded by bool_circ.start_instrumentation,
+        the rules that removed the most nodes first
+
+        Parameters:
+        -----------
+        report (dict) : the report returned by start_instrumentation or stop_instrumentation
+    '''
+    print(f"{'rule':<16} {'attempts':>9} {'fired':>9} {'time (ms)':>10} {'nodes -':>9} {'edges -':>9}")
+    rules = sorted(report["rules"].items(), key=lambda item: -item[1]["nodes_removed"])
+    for name, c in rules:
+        print(f"{name:<16} {c['attempts']:>9} {c['fired']:>9} {c['time']*1000:>10.1f} {c['nodes_removed']:>9} {c['edges_removed']:>9}")
+    rules_time = sum(c["time"] for _, c in rules)
+    print(f"{report['runs']} runs of transform_circuit, {report['visits']} nodes visited, {report['time']*1000:.1f} ms "
+          f"of which {rules_time*1000:.1f} ms in the rules")
+
+
+def benchmark_adders(widths=(8,16,32,64), vectors=1<<14, repeat=5):
+    '''
+        compares the adders of every width : number of nodes and of gates, depth and evaluation throughput
+
+        Parameters:
+        -----------
+        widths (int tuple) default=(8,16,32,64) : the widths compared, powers of two multiple of 4
+        vectors (int) default=2**14 : the number of random additions evaluated by evaluate_batch for the throughput
+        repeat (int) default=5 : the number of evaluations timed after a warm-up one, the best one gives the throughput
+
+        Returns:
+        --------
+        the list of the results, one dict per width and adder
+    '''
+    import numpy as np
+    from benchmarks.harness import time_run
+    rows = []
+    for width in widths:
+        circuits = {"adder" : adders.adder(width.bit_length()-1), "CLA_adder" : adders.CLA_adder(width//4-1)}
+        for network in adders.prefix_networks:
+            circuits[network] = adders.prefix_adder(width, network)
+        for name, circuit in circuits.items():
+            compiled = circuit.compile()
+            X = np.random.randint(0, 2, (vectors, len(circuit.get_inputs_ids())), dtype=np.uint8)
+            elapsed = min(time_run(lambda: compiled.evaluate_batch(X), repeat))
+            rows.append({"width" : width, "adder" : name, "nodes" : len(circuit.get_nodes()),
+                         "gates" : sum(1 for node in circuit.get_nodes() if not node.is_copy()),
+                         "depth" : circuit.depth_acyclic(), "additions_per_s" : vectors / elapsed})
+            print(f"{width:>4} {name:<12} nodes {rows[-1]['nodes']:>6}  gates {rows[-1]['gates']:>6}  "
+                  f"depth {rows[-1]['depth']:>4}  {rows[-1]['additions_per_s']:>12.0f} additions/s")
+    return rows
+
+def measure_import_time(module="modules.addition_checkEncode", repeat=5):
+    '''
+        measures the cold-start import time of a module of the package, in a new python process every time
+        so that nothing is already imported
+
+        Parameters:
+        -----------
+        module (str) default="modules.addition_checkEncode" : the module imported
+        repeat (int) default=5 : the number of processes, the best time is kept
+
+        Returns:
+        --------
+        the import time in seconds (float) and the list of the heavy modules it loaded (numpy)
+    '''
+    code = ("import sys, time\n"
+            "start = time.perf_counter()\n"
+            f"import {module}\n"
+            "print(time.perf_counter() - start, 'numpy' in sys.modules)")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))   #the directory containing the package
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout.split()
+        best = float(output[-2]) if best is None else min(best, float(output[-2]))
+    return best, ["numpy"] if output[-1] == "True" else []
 
 ## smallest of smallest paths between inputs and outputs of half_adder:
 def shortest_path_input_output(n, half_):
@@ -242,18 +313,9 @@ def shortest_path_input_output(n, half_):
     else :
         g = adders.CLA_adder(n)
     
-    smallest_dist = sys.maxsize
-    input_id = -1
-    output_id = -1
-    for i in g.get_inputs_ids():
-        for j in g.get_outputs_ids():
-            dist = g.shortest_path(i,j)
-            if dist<smallest_dist:
-                smallest_dist = dist
-                input_id = i
-                output_id = j
-    return smallest_dist,input_id,output_id
-
-
-check_invarients()
-print_stats()
+    import numpy as np
+    distances = g.input_output_distances()
+    if distances.size == 0 or np.isinf(distances.min()):
+        return sys.maxsize,-1,-1
+    i,j = np.unravel_index(np.argmin(distances), distances.shape)   #first pair in the order of the inputs then outputs
+    return int(distances[i,j]),g.get_inputs_ids()[i],g.get_outputs_ids()[j]
@@ -1,10 +1,12 @@
-import os
-import sys
-sys.path[0] = os.path.abspath(os.path.join(sys.path[0], '..'))
 import random
+import time
+from collections import deque
+from itertools import chain
 from modules.node import *
 from modules.bool_circ_gates_mx import bool_circ_gates_mx
 from modules.open_digraph import open_digraph
+from modules.port_list import port_list
+from modules.compiled_circ import compiled_circ
 
 class bool_circ(bool_circ_gates_mx,open_digraph):
     
@@ -14,6 +16,14 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
         g.assert_is_well_formed()
         super().__init__(g.get_inputs_ids().copy(), g.get_outputs_ids().copy(), [])
         self.nodes = g.get_id_node_map().copy()
+        self.allocator = g.allocator.copy()
+        self.topo_order = None if g.topo_order is None else g.topo_order.copy()
+        self.next_order = g.next_order
+        #the invariants of a boolean circuit are already tracked by g if it is one
+        self.violations = g.violations.copy() if isinstance(g, bool_circ) and g.violations is not None and g.dirty == set() else None
+        self.gate_table = None   #structural hashing table, see start_hashing
+        self.rule_stats = None   #counters of the simplification rules, see start_instrumentation
+        self.rule_hook = None
         assert self.is_well_formed()
     
     
@@ -22,20 +32,44 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
             Checks if the boolean circuit is well-formed
         """
         if super().is_acyclic():
-            for key,node in self.nodes.items():
-                if node.get_label() not in "&|^10~" and node.get_label() != "":
-                    return False
-                elif (node.get_label() == "" or node.get_label() == "1" or node.get_label() == "0") and node.indegree() > 1 : 
-                    return False
-                elif (node.get_label() == "&" or node.get_label() == "^" or node.get_label() == "|" or node.get_label() == "1" or node.get_label() == "0") and node.outdegree() > 1:
-                    return False
-                elif node.get_label() == "~" and (node.outdegree() != 1 or node.indegree()!= 1):
-                    return False
-                
-                
-            return True
+            return len(self.well_formedness_violations()) == 0
         return False
     
+    def node_is_well_formed(self, id):
+        """
+            Checks that the label of a node is a gate and that its degrees are the ones of this gate
+        """
+        node = self.nodes.get(id)
+        if node is None:
+            return True
+        if node.get_label() not in "&|^10~" and node.get_label() != "":
+            return False
+        elif (node.get_label() == "" or node.get_label() == "1" or node.get_label() == "0") and node.indegree() > 1 : 
+            return False
+        elif (node.get_label() == "&" or node.get_label() == "^" or node.get_label() == "|" or node.get_label() == "1" or node.get_label() == "0") and node.outdegree() > 1:
+            return False
+        elif node.get_label() == "~" and (node.outdegree() != 1 or node.indegree()!= 1):
+            return False
+        return True
+    
+    def copy(self):
+        """
+            Returns a copy of the circuit independant in memory and of the same class
+            
+            What is known about the circuit (its violations and its topological order) is copied
+            instead of being checked again, so the cost is the one of copying the nodes.
+        """
+        c = type(self).empty_bool_circ()
+        c.nodes = {id: node.copy() for id, node in self.nodes.items()}
+        c.inputs = port_list(self.inputs)
+        c.outputs = port_list(self.outputs)
+        c.allocator = self.allocator.copy()
+        c.topo_order = None if self.topo_order is None else self.topo_order.copy()
+        c.next_order = self.next_order
+        c.violations = None if self.violations is None else self.violations.copy()
+        c.dirty = self.dirty.copy()
+        return c
+    
     def insert_node(self, boolean_circ_node,parents,children):
         """
             Adds a node to the graph
@@ -54,6 +88,8 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
         r = p_ids + c_ids
         assert r==[] or all(elem in self.nodes.keys() for elem in r)
         self.nodes[boolean_circ_node.get_id()] = boolean_circ_node
+        self.touch(boolean_circ_node.get_id())
+        self.add_to_order(boolean_circ_node.get_id())
         
         
         #Adding the edges from parents and to children
@@ -73,6 +109,16 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
             bin_string = bin_string[-1:-size-1:-1]  #bufferOverflow
         return bin_string
     
+    @classmethod
+    def convert_bits_to_int(cls, bits):
+        """
+            Returns the integer whose binary representation is the list of bits (most significant first)
+        """
+        acc = 0
+        for b in bits:
+            acc = 2*acc + int(b)
+        return acc
+    
     def add_copy_node(self,parents={},children={},new_ID = None):
         if new_ID == None:
             new_ID = self.new_id()
@@ -80,12 +126,16 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
         return new_ID
     
     def add_and_node(self,parents={},children={},new_ID = None):
+        if self.gate_table is not None and parents != {} and new_ID == None:
+            return self.add_hashed_gate(and_node,"&",parents,children)
         if new_ID == None:
             new_ID = self.new_id()
         self.insert_node(and_node(new_ID,{}, {}),parents,children)
         return new_ID
     
     def add_or_node(self,parents={},children={},new_ID = None):
+        if self.gate_table is not None and parents != {} and new_ID == None:
+            return self.add_hashed_gate(or_node,"|",parents,children)
         if new_ID == None:
             new_ID = self.new_id()
         self.insert_node(or_node(new_ID,{},{}),parents,children)
@@ -98,6 +148,8 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
         return new_ID
     
     def add_xor_node(self,parents={},children={},new_ID = None):
+        if self.gate_table is not None and parents != {} and new_ID == None:
+            return self.add_hashed_gate(xor_node,"^",parents,children)
         if new_ID == None:
             new_ID = self.new_id()
         self.insert_node(xor_node(new_ID,{} , {}),parents,children)
@@ -110,6 +162,152 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
         return new_ID
     
     
+    ###Structural hashing
+    
+    def signal(self, node_id):
+        """
+            Returns the id of the node whose value is propagated to node_id, going up the chains of copy nodes
+        """
+        nnode = self.nodes[node_id]
+        while nnode.get_label() == "" and nnode.indegree() == 1:
+            node_id = list(nnode.get_parents())[0]
+            nnode = self.nodes[node_id]
+        return node_id
+    
+    def gate_key(self, label, parents):
+        """
+            Returns the key identifying a gate up to its structure : its label and the signals of its parents
+            
+            Parameters:
+            -----------
+            label (str) : the label of the gate
+            parents ({int : int}) : the parents of the gate and the multiplicity of their edges
+            
+            Returns:
+            --------
+            a hashable (label, parents) tuple, two gates with the same key compute the same function
+        """
+        signals = {}
+        for p, m in parents.items():
+            s = self.signal(p)
+            signals[s] = signals.get(s, 0) + m
+        if label == "^":   #a signal xored an even number of times cancels out
+            return (label, tuple(sorted(s for s, m in signals.items() if m % 2 == 1)))
+        return (label, tuple(sorted(signals)))
+    
+    def fanout(self, node_id):
+        """
+            Returns a copy node propagating the value of the gate node_id, inserting it below the gate if needed
+        """
+        nnode = self.nodes[node_id]
+        children = nnode.get_children()
+        if len(children) == 1:
+            child, m = list(children.items())[0]
+            if m == 1 and self.nodes[child].get_label() == "" and child not in self.get_outputs_ids():
+                return child
+        cop = self.add_copy_node()
+        for child, m in list(children.items()):
+            self.remove_parallel_edges(node_id, child)
+            self.add_edge(cop, child, m)
+        self.add_edge(node_id, cop)
+        return cop
+    
+    def start_hashing(self):
+        """
+            Enables the structural hashing of the circuit under construction : 
+            add_and_node, add_or_node and add_xor_node called with parents reuse the existing gate
+            computing the same function instead of creating a new one
+            
+            In this mode these methods return the id of the copy node propagating the value of the gate,
+            so the parents of a gate must all be given when it is added.
+        """
+        self.gate_table = {}
+        for node_id, nnode in self.nodes.items():
+            if nnode.get_label() in ["&", "|", "^"] and nnode.get_parents() != {}:
+                self.gate_table.setdefault(self.gate_key(nnode.get_label(), nnode.get_parents()), node_id)
+    
+    def stop_hashing(self):
+        """
+            Disables the structural hashing of the circuit
+        """
+        self.gate_table = None
+    
+    def add_hashed_gate(self, node_class, label, parents, children):
+        """
+            Adds a gate to a circuit in hashing mode unless an identical one already exists
+            
+            Parameters:
+            -----------
+            node_class (class) : the sub-class of circuit_node of the gate
+            label (str) : the label of the gate
+            parents ({int : int}) : the parents of the gate and the multiplicity of their edges
+            children ({int : int}) : the children of the gate and the multiplicity of their edges
+            
+            Returns:
+            --------
+            the id of the copy node propagating the value of the gate
+        """
+        key = self.gate_key(label, parents)
+        gate = self.gate_table.get(key)
+        if gate is None or gate not in self.nodes:
+            gate = self.new_id()
+            self.insert_node(node_class(gate, {}, {}), {}, {})
+            for p, m in parents.items():
+                self.add_edge(p, gate, m)
+            self.gate_table[key] = gate
+        cop = self.fanout(gate)
+        for c, m in children.items():
+            self.add_edge(cop, c, m)
+        return cop
+    
+    def strash(self):
+        """
+            Merges the gates that compute the same function because they have the same label and the same parents
+            (structural hashing), the gates left without children by the merges are removed
+            
+            Output: (inplace)
+            -------
+            The circuit without duplicated gates
+            
+            Returns:
+            --------
+            the number of removed nodes
+        """
+        inputs = set(self.get_inputs_ids())
+        outputs = set(self.get_outputs_ids())
+        nb_nodes = len(self.nodes)
+        table = {}
+        for layer in self.topological_sort():
+            for node_id in layer:
+                if node_id not in self.nodes or node_id in inputs or node_id in outputs:
+                    continue
+                nnode = self.nodes[node_id]
+                label = nnode.get_label()
+                if label == "":
+                    continue
+                key = self.gate_key(label, nnode.get_parents())
+                other = table.get(key)
+                if other is None or other not in self.nodes:
+                    table[key] = node_id
+                    continue
+                
+                #the children of the duplicate are now fed by the first gate
+                cop = self.fanout(other)
+                for c, m in list(nnode.get_children().items()):
+                    self.add_edge(cop, c, m)
+                
+                #removes the duplicate and the nodes that only fed it
+                stack = [node_id]
+                while stack != []:
+                    dead = stack.pop()
+                    parents = list(self.nodes[dead].get_parents())
+                    self.remove_node_by_id(dead)
+                    for p in parents:
+                        if p in self.nodes and p not in inputs and p not in outputs and self.nodes[p].outdegree() == 0:
+                            stack.append(p)
+        return nb_nodes - len(self.nodes)
+    
+    
     def convert_node(self,node):
         """
         Converts node to the appropriate boolean circuit component according to its current label
@@ -169,13 +367,13 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
                 if char == "(":
                     label = current_node.get_label()
                     if label == "":
-                        current_node.set_label(label+s2)
+                        circuit.relabel(current_node.get_id(),label+s2)
                     parent_node = circuit.add_node()
                     circuit.add_edge(parent_node,current_node.get_id())
                     current_node = circuit.get_node_by_id(parent_node)
                     s2 = ""
                 elif char == ")":
-                    current_node.set_label(current_node.get_label()+s2)
+                    circuit.relabel(current_node.get_id(),current_node.get_label()+s2)
                     if s2 != "" and s2 not in variables:
                         variables[s2] = current_node.get_id()
                     current_node = circuit.get_node_by_id(list(current_node.get_children().keys())[0])
@@ -195,7 +393,7 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
         for node_id,n in nodes_dict.items():
             if n.get_label() in variables:
                 circuit.merge_nodes(variables[n.get_label()],node_id)
-                circuit.get_node_by_id(variables[n.get_label()]).set_label("")
+                circuit.relabel(variables[n.get_label()],"")
                 
 
         
@@ -268,9 +466,9 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
         d = list(di.get_nodes()).copy()
         for nnodes in d:
             if len(nnodes.get_parents()) ==1 and len(nnodes.get_children()) == 1:
-                nnodes.set_label("~")
+                di.relabel(nnodes.get_id(),"~")
             elif len(nnodes.get_parents()) >1 and len(nnodes.get_children()) == 1:
-                nnodes.set_label(random.choice(["|","^","&"]))
+                di.relabel(nnodes.get_id(),random.choice(["|","^","&"]))
             elif len(nnodes.get_parents()) >1 and len(nnodes.get_children()) > 1:
                 bin_node_id = di.add_node(random.choice(["|","^","&"]),{},{})
                 #cop_node_id = di.add_node("",{},{})
@@ -396,17 +594,66 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
 
     #################### EVALUATION OF A CIRCUIT #####################
 
-    def evaluate(self):
+    def compile(self):
+        """
+            Levelizes the circuit once into a flat program that can be evaluated
+            on any number of input vectors without modifying the circuit
+            
+            Returns:
+            -------
+            compiled_circ , the compiled program of the circuit
+        """
+        return compiled_circ.from_bool_circ(self)
+
+    def evaluate_many(self, vectors):
+        """
+            Evaluates the circuit on a list of bit vectors in a single bit-sliced pass, without modifying it
+            
+            Parameters:
+            -----------
+            vectors (list) : a list of bit vectors, one bit per input in the order of the inputs
+            
+            Returns:
+            -------
+            The list of the output bits for every vector
+        """
+        return self.compile().evaluate_many(vectors)
+
+    def evaluate_batch(self, X):
+        """
+            Evaluates the circuit on every row of a numpy matrix, without modifying it
+            
+            Parameters:
+            -----------
+            X (numpy array) : a (N, n_inputs) boolean or 0/1 array, one input vector per row
+            
+            Returns:
+            -------
+            A (N, n_outputs) array with the outputs of every row
+        """
+        return self.compile().evaluate_batch(X)
+
+    def evaluate(self, inputs=None):
         """
             Evaluate the boolean circuit to produce an output.
 
             The evaluation starts from the input nodes and propagates to the output nodes,
             applying logical operations based on the node labels.
+            Without inputs, the constants already linked to the inputs are propagated and the circuit is consumed.
+            
+            Parameters:
+            -----------
+            
+            Optional:
+            inputs (list) default=None : one bit per input, the circuit is then compiled and left untouched
             
             Returns:
             -------
-            int that represents the result in binary
+            int that represents the result in binary , or the list of output bits (in the order of the outputs) if inputs are given
         """
+        if inputs is not None:
+            return self.compile().evaluate(inputs)
+        
         tmp = []
         
         #taking care of neutral gates at the beginning which dont result of transformations
@@ -416,12 +663,11 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
                 self.neutral_element(node.get_id())
                 tmp.append(node.get_id())
 
-        calculated = list(self.get_inputs_ids()) + tmp #constant nodes queue ready to be evaluated
-        outputs = list(self.get_outputs_ids()) 
+        calculated = deque(chain(self.get_inputs_ids(), tmp)) #constant nodes queue ready to be evaluated
+        outputs = set(self.get_outputs_ids())   #outputs not computed yet
         
-        while outputs != [] and calculated != []:
-            node_id = calculated[0]
-            calculated.remove(node_id)
+        while len(outputs) > 0 and len(calculated) > 0:
+            node_id = calculated.popleft()
             node = self.get_node_by_id(node_id)
             calculated += node.eval(self,outputs)  #returns nodes that wait to be evaluated and updates queue
         
@@ -437,48 +683,95 @@ class bool_circ(bool_circ_gates_mx,open_digraph):
         
         return int(res , 2)
     
+    ###Instrumentation of the simplification rules
+
+    def start_instrumentation(self, report=None, hook=None):
+        """
+            Enables the counters of the simplification rules (the methods of bool_circ_gates_mx decorated by rule)
+
+            For every rule the report records the calls (attempts), the ones that applied (fired), the time spent
+            in the rule, and the number of nodes and edges removed by the rules that fired (negative if they added
+            some). transform_circuit also records its runs, the nodes it visited and its total time, the difference
+            with the time of the rules being the time spent looking for matches.
+
+            Parameters:
+            -----------
+            Optional:
+            report (dict) default=None : the report of another circuit to which the counters are added,
+                                         a new report if None
+            hook (function) default=None : called after every rule with its name, its arguments and whether it fired
+
+            Returns:
+            --------
+            the report (dict), {"runs", "visits", "time", "rules" : {name : {"attempts", "fired", "time",
+            "nodes_removed", "edges_removed"}}}, updated until stop_instrumentation is called
+        """
+        self.rule_stats = {"runs" : 0, "visits" : 0, "time" : 0.0, "rules" : {}} if report is None else report
+        self.rule_hook = hook
+        return self.rule_stats
+
+    def stop_instrumentation(self):
+        """
+            Disables the counters of the simplification rules and returns their report
+        """
+        report = self.rule_stats
+        self.rule_stats = None
+        self.rule_hook = None
+        return report
+
     def transform_circuit(self):
         """
         Applies as many simplifications as possible to the boolean circuit using already predefined rules
         
+        Every node is visited once, then only the neighbourhood of the nodes modified by a rule
+        (the nodes themselves, their parents and their children) is visited again, until no rule applies.
+        The rules it applies are counted if the circuit is instrumented (see start_instrumentation).
+        
         Result:
         -------
         A simplified version of self that is equivalent to it
         """
+        start = time.perf_counter()
+        visits = 0
+        inputs = set(self.get_inputs_ids())
+        outputs = set(self.get_outputs_ids())
+        worklist = deque(self.get_node_ids())
+        queued = set(worklist)
+        self.touched = set()
         
-        def transform_once():
-            """
-            Runs through all the nodes of a bool_circ and applies as many transformations as possible
-
-            Returns:
-            -------
-            True if a transformation was successfully applied, false otherwise
-            (used as a flag for continuing the iteration of the circuit)
-            """
-            nodes = list(self.get_node_ids())
-            flag = False
-            for node_id in nodes:
-                r = False
-                #if id was erased dureing previous transformation, ignore
-                if node_id in self.get_inputs_ids() or node_id in self.get_outputs_ids() or node_id not in self.get_node_ids():
-                    continue
-                
-                node = self.get_node_by_id(node_id)
-                label = node.get_label()
-                first_child = (self.get_node_by_id((list(node.get_children())[0])))
-                
-                if first_child.is_copy() and len(first_child.get_children()) == 0:
-                        r=self.effacement(node_id ,list(node.get_children())[0] )
-                else:  #look for transformation
-                    r = node.transform(self)
-                    
-                if r: # a transformation was made, will iterate again
-                    flag = True
-            return flag
+        while len(worklist) > 0:
+            node_id = worklist.popleft()
+            queued.remove(node_id)
+            visits += 1
+            #if id was erased during a previous transformation, ignore
+            if node_id in inputs or node_id in outputs or node_id not in self.nodes:
+                continue
+            
+            node = self.get_node_by_id(node_id)
+            if len(node.get_children()) == 0:  #dangling node, taken care of by the rules of its parent
+                continue
+            first_child = self.get_node_by_id(next(iter(node.get_children())))
+            
+            if first_child.is_copy() and len(first_child.get_children()) == 0:
+                self.effacement(node_id, first_child.get_id())
+            else:  #look for transformation
+                node.transform(self)
+            
+            #the configurations around the modified nodes may now match a rule
+            for t in self.touched:
+                if t in self.nodes:
+                    t_node = self.nodes[t]
+                    for n in chain((t,), t_node.get_parents(), t_node.get_children()):
+                        if n not in queued:
+                            queued.add(n)
+                            worklist.append(n)
+            self.touched.clear()
         
-        cont = True
-        while cont: 
-            cont = transform_once()
+        self.touched = None
+        if self.rule_stats is not None:
+            self.rule_stats["runs"] += 1
+            self.rule_stats["visits"] += visits
+            self.rule_stats["time"] += time.perf_counter() - start
     
     def calculate(self):
         """
@@ -1,6 +1,43 @@
-import os
-import sys
-sys.path[0] = os.path.abspath(os.path.join(sys.path[0], '..'))
+import functools
+import time
+
+def rule(method):
+    """
+        Decorator of the simplification rules : when the circuit is instrumented (see bool_circ.start_instrumentation),
+        counts the calls of the rule, the ones that fired, their duration and the nodes and edges they removed
+
+        The edges are counted by open_digraph.edge_balance, the rules called by a rule are part of it.
+    """
+    name = method.__name__
+    @functools.wraps(method)
+    def instrumented(self, *ids):
+        report = self.rule_stats
+        if report is None:
+            return method(self, *ids)
+        nb_nodes = len(self.nodes)
+        balance = self.edge_balance
+        self.edge_balance = 0
+        self.rule_stats = None   #nested rules are not counted twice
+        start = time.perf_counter()
+        try:
+            fired = method(self, *ids)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.rule_stats = report
+            added = self.edge_balance
+            self.edge_balance = None if balance is None else balance + added
+
+        counters = report["rules"].setdefault(name, {"attempts" : 0, "fired" : 0, "time" : 0.0, "nodes_removed" : 0, "edges_removed" : 0})
+        counters["attempts"] += 1
+        counters["time"] += elapsed
+        counters["nodes_removed"] += nb_nodes - len(self.nodes)
+        counters["edges_removed"] -= added
+        if fired:
+            counters["fired"] += 1
+        if self.rule_hook is not None:
+            self.rule_hook(name, ids, fired)
+        return fired
+    return instrumented
 
 class bool_circ_gates_mx:
     def copy_gate(self, copy_node_id, input_node_id):
@@ -189,6 +226,32 @@ class bool_circ_gates_mx:
             node.set_label("1")
             self.convert_node(node)
 
+    @rule
+    def copy_chain(self, copy_id):
+        """
+        Removes a copy node with a single parent and a single child, linking its parent to its child.
+
+        Parameters:
+        ----------
+        copy_id : int The node ID of the copy node.
+
+        Returns:
+        -------
+        bool
+            True if the copy node was removed, otherwise False.
+        """
+        copy_node = self.get_node_by_id(copy_id)
+        assert copy_node.is_copy()
+        parents = list(copy_node.get_parents())
+        children = list(copy_node.get_children().items())
+        if len(parents) != 1 or len(children) != 1:
+            return False
+
+        self.remove_node_by_id(copy_id)
+        self.add_edge(parents[0], children[0][0], m=children[0][1])
+        return True
+
+    @rule
     def assoc_xor(self, parent_xor, child_xor):
         """
         Applies the associative property to two XOR gates.
@@ -207,13 +270,15 @@ class bool_circ_gates_mx:
         child_node = self.get_node_by_id(child_xor)
         assert parent_node.is_xor() and child_node.is_xor()
         
-        parents_of_parent = list(parent_node.get_parents())
+        parents_of_parent = list(parent_node.get_parents().items())
+        nb_arretes = parent_node.get_children()[child_xor]
         self.remove_node_by_id(parent_xor)
         
-        for p in parents_of_parent:
-            self.add_edge(p, child_xor)
+        for p, m in parents_of_parent:   #the multiplicities matter for a xor (x^x = 0)
+            self.add_edge(p, child_xor, m=m*nb_arretes)
         return True
 
+    @rule
     def assoc_and(self, parent_and, child_and):
         """
         Bonus transformation
@@ -242,6 +307,7 @@ class bool_circ_gates_mx:
         return True
 
             
+    @rule
     def assoc_or(self, parent_or, child_or):
         """
 
@@ -270,6 +336,7 @@ class bool_circ_gates_mx:
             self.add_edge(p, child_or)
         return True
 
+    @rule
     def assoc_copy(self, parent_copy, child_copy):
         """
         Applies the associative property to two copy nodes.
@@ -291,13 +358,14 @@ class bool_circ_gates_mx:
         if child_copy in self.get_outputs_ids() or parent_copy in self.get_inputs_ids():
             return False
         
-        children_of_child = list(child_node.get_children())
+        children_of_child = list(child_node.get_children().items())
         self.remove_node_by_id(child_copy)
         
-        for c in children_of_child:
-            self.add_edge(parent_copy, c)
+        for c, m in children_of_child:
+            self.add_edge(parent_copy, c, m=m)
         return True
 
+    @rule
     def involution_xor(self, xor_id, copy_id):
         """
         Resolves XOR involution based on the copy node multiplicity.
@@ -327,6 +395,7 @@ class bool_circ_gates_mx:
         else:
             return False
 
+    @rule
     def effacement(self, op_id, child_id):
         """
         Replaces an operation node with a neutral copy node.
@@ -354,6 +423,7 @@ class bool_circ_gates_mx:
             
         return True
 
+    @rule
     def not_xor(self, not_id, xor_id):
         """
         Applies a NOT gate to an XOR operation.
@@ -374,15 +444,21 @@ class bool_circ_gates_mx:
         
         parent_of_not = list(not_node.get_parents())[0]
         child_of_xor = list(xor_node.get_children())[0]
+        nb_arretes = not_node.get_children()[xor_id]   #(~x)^(~x) = x^x
         
-        self.remove_parallel_edges(xor_id, child_of_xor)
         self.remove_parallel_edges(parent_of_not, not_id)
         self.remove_parallel_edges(not_id, xor_id)
-        self.add_edge(xor_id, not_id)
-        self.add_edge(not_id, child_of_xor)
-        self.add_edge(parent_of_not, xor_id)
+        self.add_edge(parent_of_not, xor_id, m=nb_arretes)
+        if nb_arretes % 2 == 1:
+            m = xor_node.get_children()[child_of_xor]
+            self.remove_parallel_edges(xor_id, child_of_xor)
+            self.add_edge(xor_id, not_id)
+            self.add_edge(not_id, child_of_xor, m=m)
+        else:
+            self.remove_node_by_id(not_id)
         return True
     
+    @rule
     def not_copy(self, not_id, copy_id):
         """
         Applies a NOT gate to a copy operation.
@@ -407,14 +483,16 @@ class bool_circ_gates_mx:
         self.remove_node_by_id(not_id)
         self.add_edge(parent_of_not, copy_id)
 
-        children_of_copy = list(self.get_node_by_id(copy_id).get_children())
-        for c in children_of_copy:
-            new_not = self.add_not_node()
-            self.remove_edge(copy_id, c)
-            self.add_edge(copy_id, new_not)
-            self.add_edge(new_not, c)
+        children_of_copy = list(self.get_node_by_id(copy_id).get_children().items())
+        for c, m in children_of_copy:
+            for _ in range(m):   #one not gate for every edge
+                new_not = self.add_not_node()
+                self.remove_edge(copy_id, c)
+                self.add_edge(copy_id, new_not)
+                self.add_edge(new_not, c)
         return True
 
+    @rule
     def involution_not(self, not1, not2):
         """
         Resolves the involution of two NOT gates.
@@ -441,6 +519,7 @@ class bool_circ_gates_mx:
         self.add_edge(parent_of_node1, child_of_node2)
         return True
 
+    @rule
     def idempotance_and(self, and_id, copy_id):
         """
         Bonus transformation
@@ -468,6 +547,7 @@ class bool_circ_gates_mx:
         else:
             return False
         
+    @rule
     def idempotance_or(self, or_id, copy_id):
         """
         Bonus transformtion
@@ -495,6 +575,7 @@ class bool_circ_gates_mx:
         else:
             return False
 
+    @rule
     def absoroption_and(self, copy_id, or_id, and_id):
         """
         Bonus transformation
@@ -517,10 +598,11 @@ class bool_circ_gates_mx:
         assert or_node.is_or() and copy_node.is_copy() and and_node.is_and()
 
         nullifier = self.add_copy_node()
-        self.add_edge(or_node, nullifier)
+        self.add_edge(or_id, nullifier)
         self.effacement(or_id, nullifier)
         return True
 
+    @rule
     def absoroption_or(self, copy_id, or_id, and_id):
         """
         Bonus transformation
@@ -543,6 +625,6 @@ class bool_circ_gates_mx:
         assert or_node.is_or() and copy_node.is_copy() and and_node.is_and()
 
         nullifier = self.add_copy_node()
-        self.add_edge(and_node, nullifier)
+        self.add_edge(and_id, nullifier)
         self.effacement(and_id, nullifier)
         return True
@@ -0,0 +1,237 @@
+from modules.node import COPY, NOT, AND, OR, XOR, ZERO, ONE   #the opcodes of the nodes are the ones of the instructions
+
+#translation tables between the bits 0/1 and their characters "0"/"1" used when packing vectors
+TO_ASCII = bytes.maketrans(b"\x00\x01", b"01")
+FROM_ASCII = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class compiled_circ:
+
+    ###Constructor
+
+    def __init__(self, inputs, outputs, program, init):
+        """
+        inputs: int list; the slots of the input nodes, in the order of the circuit's inputs
+        outputs: int list; the slots of the output nodes, in the order of the circuit's outputs
+        program: (int,int,int tuple) list; the instructions (opcode, destination slot, source slots) in topological order
+        init: int list; the initial value of every slot (the value of the constant nodes, 0 elsewhere)
+        """
+        self.inputs = inputs
+        self.outputs = outputs
+        self.program = program
+        self.init = init
+
+    @classmethod
+    def from_bool_circ(cls, circuit):
+        """
+            Levelizes a boolean circuit into a flat program of instructions
+
+            Only the nodes on which an output depends are compiled, dangling gates left behind
+            by the simplification rules are ignored.
+
+            Parameters:
+            -----------
+            circuit (bool_circ) : the circuit to compile, it is not modified
+
+            Returns:
+            --------
+            A compiled_circ that can be evaluated as many times as needed
+        """
+        return cls.from_frozen(circuit.freeze())
+
+    @classmethod
+    def from_frozen(cls, frozen):
+        """
+            Same as from_bool_circ on the frozen_digraph snapshot of a boolean circuit
+        """
+        ids = frozen.ids.tolist()
+        ops = frozen.ops.tolist()
+        parents = frozen.adjacency_lists(-1)
+        indptr = frozen.parents_indptr.tolist()
+        multiplicity = frozen.parents_multiplicity.tolist()
+        inputs = frozen.inputs.tolist()
+        outputs = frozen.outputs.tolist()
+        init = [0 for _ in ids]
+
+        #cone of influence of the outputs
+        needed = [False for _ in ids]
+        queue = outputs.copy()
+        for s in queue:
+            needed[s] = True
+        while queue != []:
+            for p in parents[queue.pop()]:
+                if not needed[p]:
+                    needed[p] = True
+                    queue.append(p)
+        for s in inputs:
+            needed[s] = False
+
+        layers, sorted_nodes = frozen.topological_layers()
+        assert sorted_nodes >= len(ids), "graph is cyclic"
+        program = []
+        for layer in layers:
+            for s in layer:
+                if not needed[s]:
+                    continue
+                op = ops[s]
+                if op == ZERO or op == ONE:
+                    init[s] = 1 if op == ONE else 0
+                    continue
+                assert op <= XOR, f"Node {ids[s]} is not a gate."
+                if op == XOR:   #a parent linked an even number of times cancels out
+                    srcs = tuple(p for p, m in zip(parents[s], multiplicity[indptr[s]:indptr[s+1]]) if m % 2 == 1)
+                else:
+                    srcs = tuple(parents[s])
+                assert (op != COPY and op != NOT) or len(srcs) == 1, f"Node {ids[s]} has no signal to propagate."
+                program.append((op, s, srcs))
+
+        return cls(inputs, outputs, program, init)
+
+
+    ###Evaluation
+
+    def run(self, values, ones):
+        """
+            Executes the program inplace on a list of slot values
+
+            Parameters:
+            -----------
+            values (list) : the value of every slot, inputs and constants already set
+            ones : the value representing true in every slot (1 for a single evaluation,
+                    a word with all its bits set for a bit-sliced one)
+        """
+        #values may be numpy arrays shared between slots, they are never modified inplace
+        for op, dst, srcs in self.program:
+            if op == COPY:
+                values[dst] = values[srcs[0]]
+            elif op == NOT:
+                values[dst] = values[srcs[0]] ^ ones
+            elif op == AND:
+                v = ones
+                for s in srcs:
+                    v = v & values[s]
+                values[dst] = v
+            elif op == OR:
+                v = 0
+                for s in srcs:
+                    v = v | values[s]
+                values[dst] = v
+            else:
+                v = 0
+                for s in srcs:
+                    v = v ^ values[s]
+                values[dst] = v
+
+    def evaluate(self, inputs):
+        """
+            Evaluates the compiled circuit on a bit vector
+
+            Parameters:
+            -----------
+            inputs (list) : one bit (0/1 or "0"/"1") per input of the circuit, in the order of its inputs
+
+            Returns:
+            --------
+            The list of output bits in the order of the circuit's outputs
+        """
+        assert len(inputs) == len(self.inputs), "error, domains don't match."
+        values = self.init.copy()
+        for slot, bit in zip(self.inputs, inputs):
+            values[slot] = int(bit)
+        self.run(values, 1)
+        return [values[s] for s in self.outputs]
+
+    def evaluate_packed(self, words, width=64):
+        """
+            Bit-sliced evaluation : every slot holds a word whose j-th bit is its value for the j-th input pattern,
+            so a single pass over the program evaluates as many patterns as there are bits in the words
+
+            Parameters:
+            -----------
+            words (list) : one word per input of the circuit, either python ints or numpy uint64 arrays
+                           (64 patterns per element of the array)
+
+            Optional:
+            width (int) default=64 : number of patterns packed in the python ints (ignored for numpy arrays)
+
+            Returns:
+            --------
+            The list of output words in the order of the circuit's outputs
+        """
+        assert len(words) == len(self.inputs), "error, domains don't match."
+        if len(words) > 0 and hasattr(words[0], "dtype"):
+            ones = ~(words[0] ^ words[0])
+        else:
+            ones = (1 << width) - 1
+        return self.run_packed(words, ones)
+
+    def run_packed(self, words, ones):
+        """
+            Runs the program on packed words given the word with all its bits set, returns the output words
+        """
+        values = [ones if b else 0 for b in self.init]
+        for slot, word in zip(self.inputs, words):
+            values[slot] = word
+        self.run(values, ones)
+        return [values[s] & ones for s in self.outputs]
+
+    def evaluate_many(self, vectors):
+        """
+            Evaluates the compiled circuit on several bit vectors at once by packing them into words
+
+            Parameters:
+            -----------
+            vectors (list) : a list of bit vectors, each one as in evaluate
+
+            Returns:
+            --------
+            The list of the output bits of every vector
+        """
+        n = len(vectors)
+        if n == 0:
+            return []
+        #the j-th vector is the j-th bit of the words, i.e the (n-1-j)-th character of their binary strings
+        if isinstance(vectors[0], str) or (len(vectors[0]) > 0 and isinstance(vectors[0][0], str)):
+            words = [int("".join(column), 2) for column in zip(*reversed(vectors))]
+        else:
+            words = [int(bytes(column).translate(TO_ASCII), 2) for column in zip(*reversed(vectors))]
+        assert len(words) == len(self.inputs), "error, domains don't match."
+
+        results = self.evaluate_packed(words, width=n)
+        if results == []:
+            return [[] for _ in range(n)]
+        strings = [format(word, f"0{n}b").encode().translate(FROM_ASCII) for word in results]
+        return [list(row) for row in reversed(list(zip(*strings)))]
+
+    def evaluate_batch(self, X):
+        """
+            Evaluates the compiled circuit on every row of a matrix with numpy
+
+            The columns of X are packed 64 rows per uint64 word so that every instruction
+            is a vectorized operation over N/64 words.
+
+            Parameters:
+            -----------
+            X (numpy array) : a (N, n_inputs) boolean or 0/1 array, one input vector per row
+
+            Returns:
+            --------
+            A (N, n_outputs) array of the outputs of every row (boolean if X is boolean, uint8 otherwise)
+        """
+        import numpy as np
+        X = np.asarray(X)
+        assert X.ndim == 2 and X.shape[1] == len(self.inputs), "error, domains don't match."
+        N = X.shape[0]
+        k = (N + 63) // 64
+        if len(self.outputs) == 0 or N == 0:
+            return np.zeros((N, len(self.outputs)), dtype=bool if X.dtype == bool else np.uint8)
+
+        #one row of bytes per input, padded to whole uint64 words
+        packed = np.packbits(X.T != 0, axis=1, bitorder="little")
+        packed = np.ascontiguousarray(np.pad(packed, ((0, 0), (0, 8*k - packed.shape[1]))))
+        words = list(packed.view(np.uint64))
+        ones = np.full(k, np.iinfo(np.uint64).max, dtype=np.uint64)
+
+        results = np.stack(self.run_packed(words, ones))
+        bits = np.unpackbits(results.view(np.uint8), axis=1, count=N, bitorder="little")
+        return bits.T.astype(bool) if X.dtype == bool else bits.T.copy()
@@ -0,0 +1,310 @@
+import re
+from modules.node import node
+
+ID = r'[A-Za-z_\x80-\U0010ffff][A-Za-z_0-9\x80-\U0010ffff]*|-?(?:\.[0-9]+|[0-9]+(?:\.[0-9]*)?)'   #identifier or numeral
+STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+NAME = rf'(?:{STRING}|{ID})(?![A-Za-z_0-9.\x80-\U0010ffff])'
+NODE_ID = rf'({NAME})(?:\s*:\s*{NAME}){{0,2}}'   #node name and its optional port, which is ignored
+ATTRIBUTES = rf'\[[^\]"]*(?:{STRING}[^\]"]*)*\]'
+KEYWORD = r'(?i:(?:node|edge|graph|digraph|subgraph|strict)(?![A-Za-z_0-9\x80-\U0010ffff]))'
+END = r'\s*(?:;\s*)?(?=[^\s\-\[:=])'   #a statement (and its ;) is complete once the next token is known not to extend it
+
+#the tokens of the .dot language : blanks and comments (skipped), quoted strings, operators and identifiers or numerals
+SIMPLE_TOKEN = (r'(?P<skip>\s+|//[^\n]*(?:\n|$)|#[^\n]*(?:\n|$)|/\*.*?\*/)'
+                rf'|(?P<string>{STRING})'
+                r'|(?P<op>->|--|[{}\[\];,=:])'
+                rf'|(?P<id>{ID})')
+SIMPLE = re.compile(SIMPLE_TOKEN, re.S)
+#at the beginning of a statement, the usual node and edge statements are matched as a whole, which saves most of
+#the work of the parser, the other statements are read token by token
+NODE_ID_GROUPLESS = NODE_ID.replace("(", "(?:", 1)
+TOKEN = re.compile(
+    rf'(?P<statement>(?!{KEYWORD})(?P<chain>{NODE_ID_GROUPLESS}(?:\s*(?:->|--)\s*{NODE_ID_GROUPLESS})*)'
+    rf'\s*(?P<attributes>(?:{ATTRIBUTES}\s*)*){END})'
+    rf'|{SIMPLE_TOKEN}', re.S)
+NODE_IDS = re.compile(NODE_ID)
+ATTRIBUTE = re.compile(rf'({NAME})\s*=\s*({NAME})')
+ESCAPE = re.compile(r'\\(.)', re.S)
+NODE_NAME = re.compile(r'v(0|[1-9][0-9]*)')   #the names given by open_digraph.dot_lines
+
+
+def unquote(name):
+    """
+        Returns the value of an identifier or of a quoted string, whose only escapes are \" and the line continuations
+    """
+    if name[:1] != '"':
+        return name
+    if "\\" not in name:
+        return name[1:-1]
+    return ESCAPE.sub(lambda e: '"' if e.group(1) == '"' else "" if e.group(1) == "\n" else e.group(0), name[1:-1])
+
+def dot_tokens(f, chunk_size=1<<16):
+    """
+        Splits a .dot document into tokens, reading it a chunk at a time
+
+        Parameters:
+        -----------
+        f : an object with a read(int) method returning str, an opened file for instance
+
+        Optional:
+        chunk_size (int) default=2**16 : the number of characters read at once
+
+        Returns:
+        --------
+        a generator of (kind, value) tuples : ("string", text without its quotes and unescaped), ("op", text), ("id", text),
+        ("edge", the names of the chain) or ("node", (name, {attribute : value}))
+    """
+    buffer = ""
+    eof = False
+    statement = True   #the next token begins a statement
+    while not eof:
+        chunk = f.read(chunk_size)
+        eof = chunk == ""
+        buffer += chunk
+        pos = 0
+        n = len(buffer)
+        while pos < n:
+            m = (TOKEN if statement else SIMPLE).match(buffer, pos)
+            if m is None and buffer[pos] not in '"/-':   #only a string, a comment or an operator can be cut by the chunk
+                raise ValueError(f"Invalid .dot file, unexpected {buffer[pos:pos+20]!r}")
+            if m is None or (m.end() == n and not eof):   #the token may go on in the next chunk
+                break
+            kind = m.lastgroup
+            if kind != "skip":
+                statement = kind == "statement" or (kind == "op" and m.group(kind) in ";{}]")
+            if kind == "statement":
+                names = NODE_IDS.findall(m.group("chain"))
+                if len(names) > 1:
+                    yield "edge", [unquote(name) for name in names]
+                else:
+                    yield "node", (unquote(names[0]), {unquote(k): unquote(v) for k, v in ATTRIBUTE.findall(m.group("attributes"))})
+            elif kind == "string":
+                yield kind, unquote(m.group(kind))
+            elif kind != "skip":
+                yield kind, m.group(kind)
+            pos = m.end()
+        buffer = buffer[pos:]
+    if buffer != "":
+        raise ValueError(f"Invalid .dot file, unexpected {buffer[:20]!r}")
+
+
+class dot_parser:
+    '''
+        Reads the first graph of a .dot document in a single pass, the nodes being built once it is read
+    '''
+
+    ###Constructor
+
+    def __init__(self, f, chunk_size=1<<16):
+        """
+        tokens: the generator of dot_tokens
+        pending: (str,str) list; the tokens read ahead and put back
+        names: str->int dict; the index of every node name, in order of appearance
+        attributes: dict list; the attributes given to every node
+        children: (int->int dict) list; the multiplicity of the edges from every node, by indexes
+        inputs, outputs: int list; the indexes of the nodes declared with input=True / output=True, in order
+        """
+        self.tokens = dot_tokens(f, chunk_size)
+        self.pending = []
+        self.names = {}
+        self.attributes = []
+        self.children = []
+        self.inputs = []
+        self.outputs = []
+
+
+    ###Tokens
+
+    def next_token(self):
+        if self.pending != []:
+            return self.pending.pop()
+        return next(self.tokens, (None, None))
+
+    def expect(self, text):
+        kind, token = self.next_token()
+        if kind != "op" or token != text:
+            raise ValueError(f"Invalid .dot file, {text!r} expected instead of {token!r}")
+
+    def identifier(self):
+        """
+            Reads a node name, dropping its port (name:port:compass)
+        """
+        kind, name = self.next_token()
+        if kind != "id" and kind != "string":
+            raise ValueError(f"Invalid .dot file, node name expected instead of {name!r}")
+        kind, token = self.next_token()
+        while (kind, token) == ("op", ":"):
+            self.next_token()
+            kind, token = self.next_token()
+        self.pending.append((kind, token))
+        return name
+
+    def attribute_list(self):
+        """
+            Reads the [key=value, ...] lists following a statement (the first [ being already read)
+        """
+        attributes = {}
+        while True:
+            kind, token = self.next_token()
+            if kind is None:
+                raise ValueError("Invalid .dot file, unclosed [")
+            if kind == "op" and token == "]":
+                kind, token = self.next_token()
+                if (kind, token) != ("op", "["):
+                    self.pending.append((kind, token))
+                    return attributes
+            elif kind == "op" and (token == "," or token == ";"):
+                continue
+            elif kind == "op":
+                raise ValueError(f"Invalid .dot file, attribute expected instead of {token!r}")
+            else:
+                self.expect("=")
+                attributes[token] = self.identifier()
+
+
+    ###Statements
+
+    def index(self, name):
+        """
+            Returns the index of a node name, creating the node the first time
+        """
+        i = self.names.get(name)
+        if i is None:
+            i = self.names[name] = len(self.attributes)
+            self.attributes.append({})
+            self.children.append({})
+        return i
+
+    def node_statement(self, name, attributes):
+        i = self.index(name)
+        known = self.attributes[i]
+        for key, ports in (("input", self.inputs), ("output", self.outputs)):
+            if attributes.get(key, "false").lower() == "true" and known.get(key, "false").lower() != "true":
+                ports.append(i)
+        known.update(attributes)
+
+    def edge_statement(self, names):
+        """
+            Adds an edge between the consecutive nodes of a chain a -> b -> c, repeated edges being counted
+            as the multiplicity of the edge
+        """
+        indexes = [self.index(name) for name in names]
+        for src, tgt in zip(indexes, indexes[1:]):
+            children = self.children[src]
+            children[tgt] = children.get(tgt, 0) + 1
+
+    def parse(self):
+        """
+            Reads the statements of the first graph of the document, the subgraphs being flattened into it
+            and the default attributes (node [...], edge [...], graph [...]) being ignored
+        """
+        kind, token = self.next_token()
+        if kind == "id" and token.lower() == "strict":
+            kind, token = self.next_token()
+        if kind != "id" or token.lower() not in ("digraph", "graph"):
+            raise ValueError(f"Invalid .dot file, digraph expected instead of {token!r}")
+        kind, token = self.next_token()
+        if kind != "op":   #name of the graph
+            kind, token = self.next_token()
+        if (kind, token) != ("op", "{"):
+            raise ValueError("Invalid .dot file, no {")
+
+        depth = 1
+        while depth > 0:
+            kind, token = self.next_token()
+            if kind is None:
+                raise ValueError("Invalid .dot file, missing }")
+            if kind == "op":
+                if token == "{":
+                    depth += 1
+                elif token == "}":
+                    depth -= 1
+                elif token != ";" and token != ",":
+                    raise ValueError(f"Invalid .dot file, unexpected {token!r}")
+            elif kind == "edge":
+                self.edge_statement(token)
+            elif kind == "node":
+                self.node_statement(*token)
+            elif kind == "id" and token.lower() in ("graph", "node", "edge"):
+                self.expect("[")
+                self.attribute_list()
+            elif kind == "id" and token.lower() == "subgraph":
+                kind, token = self.next_token()
+                if kind != "op":   #name of the subgraph
+                    kind, token = self.next_token()
+                if (kind, token) != ("op", "{"):
+                    raise ValueError("Invalid .dot file, subgraph without {")
+                depth += 1
+            else:
+                self.pending.append((kind, token))
+                names = [self.identifier()]
+                kind, token = self.next_token()
+                if (kind, token) == ("op", "="):   #attribute of the graph
+                    self.identifier()
+                    continue
+                while kind == "op" and (token == "->" or token == "--"):
+                    names.append(self.identifier())
+                    kind, token = self.next_token()
+                attributes = self.attribute_list() if (kind, token) == ("op", "[") else {}
+                if (kind, token) != ("op", "["):
+                    self.pending.append((kind, token))
+                if len(names) > 1:
+                    self.edge_statement(names)
+                else:
+                    self.node_statement(names[0], attributes)
+
+
+    ###Graph
+
+    def node_ids(self):
+        """
+            Returns the id of every node : n for the nodes named vn (as written by open_digraph.dot_lines),
+            the smallest unused ids for the others
+        """
+        ids = [None] * len(self.attributes)
+        for name, i in self.names.items():
+            m = NODE_NAME.fullmatch(name)
+            if m is not None:
+                ids[i] = int(m.group(1))
+        used = set(ids)
+        free = 0
+        for i in range(len(ids)):
+            if ids[i] is None:
+                while free in used:
+                    free += 1
+                ids[i] = free
+                used.add(free)
+        return ids
+
+    def label(self, id, attributes):
+        """
+            Returns the label of a node, without the id added by the verbose mode of open_digraph.dot_lines
+        """
+        label = attributes.get("label", "")
+        for suffix in (f"\\id={id}", f"\nid={id}", f"\\nid={id}"):
+            if label.endswith(suffix):
+                return label[:-len(suffix)]
+        if attributes.get("shape") == "circle" and label == f"{id}":   #copy node labelled by its id
+            return ""
+        return label
+
+    def graph(self):
+        """
+            Parses the document and builds its nodes
+
+            Returns:
+            --------
+            the ids of the inputs, the ids of the outputs and the list of the nodes
+        """
+        self.parse()
+        ids = self.node_ids()
+        nodes = [node(id, self.label(id, attributes), {}, {}) for id, attributes in zip(ids, self.attributes)]
+        for src, children in enumerate(self.children):
+            src_node = nodes[src]
+            for tgt, m in children.items():
+                src_node.children[ids[tgt]] = m
+                nodes[tgt].parents[ids[src]] = m
+        inputs = [ids[i] for i in self.inputs]
+        outputs = [ids[o] for o in self.outputs]
+        assert set(inputs).isdisjoint(outputs), "The node is both an input and output node"
+        return inputs, outputs, nodes
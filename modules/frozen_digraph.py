@@ -0,0 +1,252 @@
+import heapq
+from collections import deque
+
+class frozen_digraph:
+
+    ###Constructor
+
+    def __init__(self, ids, inputs, outputs, ops, children, parents):
+        """
+        ids: int array; the id of the node stored in every slot, slots being the integers of id_map
+        inputs: int array; the slots of the input nodes
+        outputs: int array; the slots of the output nodes
+        ops: int array; the opcode of the label of every node
+        children: (array,array,array); the (indptr, indices, multiplicity) CSR arrays of the children,
+                  the children of the slot s are indices[indptr[s]:indptr[s+1]]
+        parents: (array,array,array); the CSR arrays of the parents
+        id_list: int list; ids as a python list
+        adjacency: (int,bool)->list dict; the python views of adjacency_lists already built, by direction and weights
+        """
+        self.ids = ids
+        self.id_list = ids.tolist()
+        self.slots = {id: s for s, id in enumerate(self.id_list)}
+        self.inputs = inputs
+        self.outputs = outputs
+        self.ops = ops
+        self.children_indptr, self.children_indices, self.children_multiplicity = children
+        self.parents_indptr, self.parents_indices, self.parents_multiplicity = parents
+        for array in [ids, inputs, outputs, ops, *children, *parents]:
+            array.flags.writeable = False
+        self.adjacency = {}
+
+    @classmethod
+    def from_open_digraph(cls, g):
+        """
+            Builds the compressed sparse row snapshot of a graph
+
+            Parameters:
+            -----------
+            g (open_digraph) : the graph to freeze, later modifications of g are not reflected
+
+            Returns:
+            --------
+            A frozen_digraph whose slots are the integers given by g.id_map()
+        """
+        import numpy as np   #numpy is only loaded once a graph is frozen, not when the package is imported
+        slots = g.id_map()
+        nodes = g.get_id_node_map()
+
+        def csr(neighbours):
+            indptr = [0]
+            indices = []
+            multiplicity = []
+            for node_id in slots:
+                for n, m in neighbours(nodes[node_id]).items():
+                    indices.append(slots[n])
+                    multiplicity.append(m)
+                indptr.append(len(indices))
+            return (np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int64),
+                    np.array(multiplicity, dtype=np.int64))
+
+        return cls(np.array(list(slots), dtype=np.int64),
+                   np.array([slots[i] for i in g.get_inputs_ids()], dtype=np.int64),
+                   np.array([slots[o] for o in g.get_outputs_ids()], dtype=np.int64),
+                   np.array([nodes[i].op for i in slots], dtype=np.int64),
+                   csr(lambda n: n.get_children()), csr(lambda n: n.get_parents()))
+
+
+    ### Getters
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_inputs_ids(self):
+        return self.ids[self.inputs].tolist()
+
+    def get_outputs_ids(self):
+        return self.ids[self.outputs].tolist()
+
+    def get_node_ids(self):
+        return list(self.id_list)
+
+    def get_children_slots(self, s):
+        return self.children_indices[self.children_indptr[s]:self.children_indptr[s+1]]
+
+    def get_parents_slots(self, s):
+        return self.parents_indices[self.parents_indptr[s]:self.parents_indptr[s+1]]
+
+    def adjacency_lists(self, direction=1, weights=False):
+        """
+            Returns the neighbours of every slot as python lists, which are faster than numpy arrays
+            to walk one element at a time. The snapshot being immutable, every view is built once and
+            shared by all the later calls, so the lists must not be modified.
+
+            Parameters:
+            -----------
+            direction (int) default=1 : 1 for the children, -1 for the parents, 0 for both
+            weights (bool) default=False : returns the multiplicities of the edges instead of the neighbours,
+                                           in the same order
+
+            Returns:
+            --------
+            a list of int lists indexed by slots
+        """
+        key = (direction, weights)
+        if key not in self.adjacency:
+            if direction == 0:
+                lists = [c + p for c, p in zip(self.adjacency_lists(1, weights), self.adjacency_lists(-1, weights))]
+            else:
+                if direction == 1:
+                    indptr, indices, multiplicity = self.children_indptr, self.children_indices, self.children_multiplicity
+                else:
+                    indptr, indices, multiplicity = self.parents_indptr, self.parents_indices, self.parents_multiplicity
+                indptr, values = indptr.tolist(), (multiplicity if weights else indices).tolist()
+                lists = [values[indptr[s]:indptr[s+1]] for s in range(len(self.ids))]
+            self.adjacency[key] = lists
+        return self.adjacency[key]
+
+
+    ###Algorithms
+
+    def dijkstra(self, src_node, direction=0, tgt=None, weighted=False):
+        """
+            Same as open_digraph.dijkstra : a breadth first search with unit weights, otherwise a dijkstra
+            with a binary heap
+
+            Parameters:
+            -----------
+            src_node (int) : the id of the source node
+            direction (int) default=0 : 0 for both directions, 1 for the children only, -1 for the parents only
+            tgt (int) default=None : stops the search once the distance to tgt is known
+            weighted (bool) default=False : if True the multiplicity of an edge is its length, otherwise every edge has length 1
+
+            Returns:
+            --------
+            dict,dict {int:int}{int:int} : the length of the path to each node reached from the source node /
+            the previous node on this path
+        """
+        ids = self.id_list
+        neighbours = self.adjacency_lists(direction)
+        src = self.slots[src_node]
+        dist = {src: 0}
+        prev = {}
+        if not weighted:
+            queue = deque([src])
+            while queue:
+                u = queue.popleft()
+                if ids[u] == tgt:
+                    break
+                for v in neighbours[u]:
+                    if v not in dist:
+                        dist[v] = dist[u] + 1
+                        prev[v] = u
+                        queue.append(v)
+        else:
+            weights = self.adjacency_lists(direction, weights=True)
+            heap = [(0, src)]
+            done = set()
+            while heap:
+                d, u = heapq.heappop(heap)
+                if u in done:   #outdated entry
+                    continue
+                done.add(u)
+                if ids[u] == tgt:
+                    break
+                for v, m in zip(neighbours[u], weights[u]):
+                    if v not in dist or dist[v] > d + m:
+                        dist[v] = d + m
+                        prev[v] = u
+                        heapq.heappush(heap, (d + m, v))
+        return ({ids[s]: d for s, d in dist.items()}, {ids[s]: ids[p] for s, p in prev.items()})
+
+    def topological_layers(self):
+        """
+            Kahn's algorithm on the slots, the inputs being considered as already sorted
+
+            Returns:
+            --------
+            The layers of slots as in open_digraph.topological_sort and the number of sorted nodes,
+            less than len(self) if the graph is cyclic
+        """
+        import numpy as np
+        children = self.adjacency_lists(1)
+        count = np.diff(self.parents_indptr).tolist()
+        is_input = [False] * len(self.ids)
+        for i in self.inputs.tolist():
+            is_input[i] = True
+        for i in self.inputs.tolist():
+            for c in children[i]:
+                count[c] -= 1
+        layer = [s for s in range(len(self.ids)) if count[s] == 0 and not is_input[s]]
+        layers = []
+        sorted_nodes = sum(is_input)
+        while layer != []:
+            layers.append(layer)
+            sorted_nodes += len(layer)
+            next_layer = []
+            for s in layer:
+                for c in children[s]:
+                    count[c] -= 1
+                    if count[c] == 0 and not is_input[c]:
+                        next_layer.append(c)
+            layer = next_layer
+        return layers, sorted_nodes
+
+    def topological_sort(self):
+        """
+            Same as open_digraph.topological_sort : returns the list of layers of node ids
+        """
+        layers, sorted_nodes = self.topological_layers()
+        assert sorted_nodes >= len(self.ids), "graph is cyclic"
+        ids = self.id_list
+        return [[ids[s] for s in layer] for layer in layers]
+
+    def is_acyclic(self):
+        """
+            Checks if the graph is acyclic by peeling off the nodes without parents (Kahn's algorithm)
+        """
+        import numpy as np
+        children = self.adjacency_lists(1)
+        count = np.diff(self.parents_indptr).tolist()
+        stack = [s for s in range(len(self.ids)) if count[s] == 0]
+        seen = 0
+        while stack != []:
+            s = stack.pop()
+            seen += 1
+            for c in children[s]:
+                count[c] -= 1
+                if count[c] == 0:
+                    stack.append(c)
+        return seen == len(self.ids)
+
+    def connected_components(self):
+        """
+            Same as open_digraph.connected_components : returns the number of connected components
+            and a map from each node id to the connected component it belongs to
+        """
+        ids = self.id_list
+        neighbours = self.adjacency_lists(0)
+        component = [-1] * len(ids)
+        nb = 0
+        for s in range(len(ids)):
+            if component[s] == -1:
+                component[s] = nb
+                stack = [s]
+                while stack != []:
+                    u = stack.pop()
+                    for v in neighbours[u]:
+                        if component[v] == -1:
+                            component[v] = nb
+                            stack.append(v)
+                nb += 1
+        return (nb, dict(zip(ids, component)))
@@ -0,0 +1,237 @@
+from modules.node import node
+from modules.open_digraph import open_digraph
+from modules.frozen_digraph import frozen_digraph
+from modules.compiled_circ import compiled_circ
+
+class hier_circ:
+
+    ###Constructor
+
+    def __init__(self, instances, wires, inputs, outputs):
+        """
+        instances: list; the sub-circuits, either graphs (open_digraph, the leaves) or hier_circ,
+                   the same object can be instantiated several times, it is never copied
+        wires: ((int,int),(int,int)) list; the connections ((k,i),(l,j)) from the i-th output of the k-th instance
+               to the j-th input of the l-th instance
+        inputs: (int,int) list; the inputs (k,j) of the instances that are the inputs of the circuit, in order
+        outputs: (int,int) list; the outputs (k,i) of the instances that are the outputs of the circuit, in order
+        """
+        self.instances = instances
+        self.wires = wires
+        self.inputs = inputs
+        self.outputs = outputs
+        driven = [j for _, j in wires] + inputs
+        assert len(set(driven)) == len(driven), "error, an input is connected twice."
+
+    @classmethod
+    def ports(cls, circuit):
+        """
+            Returns the number of inputs and outputs of a graph or of a hier_circ
+        """
+        return (len(circuit.get_inputs_ids()), len(circuit.get_outputs_ids()))
+
+    @classmethod
+    def parallel(cls, first, g):
+        """
+            Same as open_digraph.parallel without copying anything : the result only references first and g
+
+            Parameters:
+            -----------
+            first, g (open_digraph or hier_circ) : the circuits put in parallel, the inputs and outputs of first come first
+
+            Returns:
+            --------
+            hier_circ
+        """
+        (in1, out1), (in2, out2) = cls.ports(first), cls.ports(g)
+        return cls([first, g], [],
+                   [(0, j) for j in range(in1)] + [(1, j) for j in range(in2)],
+                   [(0, i) for i in range(out1)] + [(1, i) for i in range(out2)])
+
+    @classmethod
+    def compose(cls, first, f):
+        """
+            Same as open_digraph.compose (f followed by first) without copying anything
+
+            The outputs of f are linked by an edge to the inputs of first instead of being merged with them.
+
+            Parameters:
+            -----------
+            first, f (open_digraph or hier_circ) : the circuits composed in sequence
+
+            Returns:
+            --------
+            hier_circ with the inputs of f and the outputs of first
+        """
+        (in1, out1), (in2, out2) = cls.ports(first), cls.ports(f)
+        assert out2 == in1, "error, domains don't match."
+        return cls([first, f], [((1, i), (0, i)) for i in range(in1)],
+                   [(1, j) for j in range(in2)], [(0, i) for i in range(out1)])
+
+
+    ### Getters
+
+    def get_inputs_ids(self):
+        return self.inputs
+
+    def get_outputs_ids(self):
+        return self.outputs
+
+    def modules(self):
+        """
+            Returns the list of the distinct hier_circ and graphs reachable from this circuit, each one once
+            whatever its number of instances
+        """
+        seen = {id(self): self}
+        stack = [self]
+        while stack != []:
+            circuit = stack.pop()
+            if isinstance(circuit, hier_circ):
+                for sub in circuit.instances:
+                    if id(sub) not in seen:
+                        seen[id(sub)] = sub
+                        stack.append(sub)
+        return list(seen.values())
+
+    def size(self):
+        """
+            Returns the number of nodes of the flattened circuit without flattening it
+        """
+        sizes = {}
+        def size_of(circuit):
+            if id(circuit) not in sizes:
+                if isinstance(circuit, hier_circ):
+                    sizes[id(circuit)] = sum(size_of(sub) for sub in circuit.instances)
+                else:
+                    sizes[id(circuit)] = len(circuit.get_id_node_map())
+            return sizes[id(circuit)]
+        return size_of(self)
+
+
+    ###Flattening
+
+    def leaves(self):
+        """
+            Returns the instances of graphs of the flattened circuit, in the order in which they are flattened
+        """
+        result = []
+        def visit(circuit):
+            for sub in circuit.instances:
+                if isinstance(sub, hier_circ):
+                    visit(sub)
+                else:
+                    result.append(sub)
+        visit(self)
+        return result
+
+    def connect_ports(self, leaf_inputs, leaf_outputs, link):
+        """
+            Resolves the inputs and outputs of the circuit and links its wires, the instances being already flattened
+
+            Parameters:
+            -----------
+            leaf_inputs, leaf_outputs (iterator) : the flattened inputs and outputs of the instances of graphs,
+                                                   in the order of leaves
+            link (function) : called on the flattened (output, input) of every wire
+
+            Returns:
+            --------
+            the flattened inputs and outputs of the circuit
+        """
+        ports = []
+        for sub in self.instances:
+            if isinstance(sub, hier_circ):
+                ports.append(sub.connect_ports(leaf_inputs, leaf_outputs, link))
+            else:
+                ports.append((next(leaf_inputs), next(leaf_outputs)))
+        for (k, i), (l, j) in self.wires:
+            link(ports[k][1][i], ports[l][0][j])
+        return ([ports[k][0][j] for k, j in self.inputs], [ports[k][1][i] for k, i in self.outputs])
+
+    def flatten(self, base=0):
+        """
+            Builds the flat graph of the circuit, every instance getting its own copy of the nodes
+
+            Parameters:
+            -----------
+            Optional:
+            base (int) default=0 : the smallest id of the graph, the ids of the instances are shifted so that
+                                   they do not overlap
+
+            Returns:
+            --------
+            a graph of the class of the first leaf (bool_circ or adders for the circuits of the adders)
+        """
+        nodes = {}
+        leaf_inputs = []
+        leaf_outputs = []
+        leaves = self.leaves()
+        b = base
+        for leaf in leaves:
+            for n in leaf.get_nodes():
+                nodes[n.id + b] = node(n.id + b, n.get_label(), {p + b: m for p, m in n.get_parents().items()},
+                                       {c + b: m for c, m in n.get_children().items()})
+            leaf_inputs.append([i + b for i in leaf.get_inputs_ids()])
+            leaf_outputs.append([o + b for o in leaf.get_outputs_ids()])
+            b += max(leaf.get_node_ids(), default=-1) + 1   #the next instance starts after the biggest id
+
+        def link(src, tgt):
+            nodes[src].add_child_id(tgt)
+            nodes[tgt].add_parent_id(src)
+
+        inputs, outputs = self.connect_ports(iter(leaf_inputs), iter(leaf_outputs), link)
+        g = open_digraph(inputs, outputs, nodes.values())
+        return g if leaves == [] or type(leaves[0]) is open_digraph else type(leaves[0])(g)
+
+    def freeze(self):
+        """
+            Builds the frozen_digraph of the flattened circuit directly from the frozen_digraph of every distinct
+            graph, without creating any node
+
+            Returns:
+            --------
+            frozen_digraph with the same ids as flatten()
+        """
+        import numpy as np
+        frozen = {}
+        empty = np.zeros(0, dtype=np.int64)
+        ids, ops, edges = [empty], [empty], [(empty, empty, empty)]
+        leaf_inputs, leaf_outputs = [], []
+        b = s = 0
+        for leaf in self.leaves():
+            if id(leaf) not in frozen:
+                f = leaf.freeze()
+                src = np.repeat(np.arange(len(f), dtype=np.int64), np.diff(f.children_indptr))
+                frozen[id(leaf)] = (f, src, max(leaf.get_node_ids(), default=-1) + 1)
+            f, src, span = frozen[id(leaf)]
+            ids.append(f.ids + b)
+            ops.append(f.ops)
+            edges.append((src + s, f.children_indices + s, f.children_multiplicity))
+            leaf_inputs.append((f.inputs + s).tolist())
+            leaf_outputs.append((f.outputs + s).tolist())
+            b += span
+            s += len(f)
+
+        wires = []
+        inputs, outputs = self.connect_ports(iter(leaf_inputs), iter(leaf_outputs),
+                                             lambda src, tgt: wires.append((src, tgt)))
+        if wires != []:
+            w = np.array(wires, dtype=np.int64)
+            edges.append((w[:, 0], w[:, 1], np.ones(len(w), dtype=np.int64)))
+        ids = np.concatenate(ids)
+        src, tgt, multiplicity = (np.concatenate(a) for a in zip(*edges))
+
+        def csr(a, b):
+            order = np.argsort(a, kind="stable")
+            indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(a, minlength=len(ids)), out=indptr[1:])
+            return (indptr, b[order], multiplicity[order])
+
+        return frozen_digraph(ids, np.array(inputs, dtype=np.int64), np.array(outputs, dtype=np.int64),
+                              np.concatenate(ops), csr(src, tgt), csr(tgt, src))
+
+    def compile(self):
+        """
+            Compiles the flattened circuit (see bool_circ.compile) without flattening it into nodes
+        """
+        return compiled_circ.from_frozen(self.freeze())
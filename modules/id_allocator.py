@@ -0,0 +1,64 @@
+import heapq
+
+class id_allocator:
+
+    ###Constructor
+
+    def __init__(self):
+        """
+        next: int; high-water mark, every id from 0 to next-1 is used or in free
+        free: int list; min-heap of the ids released below the high-water mark
+        """
+        self.next = 0
+        self.free = []
+
+    def copy(self):
+        """
+            Returns a copy of the allocator independant in memory
+        """
+        a = id_allocator()
+        a.next = self.next
+        a.free = self.free.copy()
+        return a
+
+
+    ###Allocation
+
+    def new_id(self, nodes):
+        """
+            Returns the smallest id not used by nodes in amortized constant time
+
+            The id is only reserved once a node is added with it in nodes, so calling it twice
+            without adding a node returns the same id.
+
+            Parameters:
+            -----------
+            nodes (dict) : the map of the nodes of the graph, keyed by their id
+
+            Returns:
+            --------
+            a new unique id usable in the graph
+        """
+        free = self.free
+        while free != [] and free[0] in nodes:   #released ids reused since then
+            heapq.heappop(free)
+        while self.next in nodes:
+            self.next += 1
+        if free != [] and free[0] < self.next:
+            return free[0]
+        return self.next
+
+    def release(self, id):
+        """
+            Records that id is not used anymore so that it can be reused
+        """
+        if id < self.next:
+            heapq.heappush(self.free, id)
+
+    def reset(self):
+        """
+            Forgets everything known about the used ids, to call when the ids of the graph are changed wholesale
+            (the next allocation scans the ids again from 0)
+        """
+        self.next = 0
+        self.free = []
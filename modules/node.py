@@ -1,6 +1,31 @@
 from abc import ABC, abstractmethod
+
+#small-int opcodes of the labels, the gates of the boolean circuits have fixed ones
+COPY = 0
+NOT = 1
+AND = 2
+OR = 3
+XOR = 4
+ZERO = 5
+ONE = 6
+OTHER = 7   #any other label, kept as a string by the node
+
+#label of every fixed opcode
+LABELS = ["", "~", "&", "|", "^", "0", "1"]
+OPCODES = {label: op for op, label in enumerate(LABELS)}
+
+def opcode(label):
+    """
+        Returns the opcode of a label, OTHER if it isn't one of the gate alphabet
+    """
+    return OPCODES.get(label, OTHER)
+
+
 class node:
     
+    #no per-instance __dict__ : the label is stored as its opcode in op, and in text when the opcode is OTHER
+    __slots__ = ("id", "op", "text", "parents", "children")
+    
     ###Constructor
     
     def __init__(self , identity , label , parents , children):
@@ -13,7 +38,7 @@ class node:
         """
         
         self.id = identity
-        self.label = label
+        self.set_label(label)
         self.parents = parents
         self.children = children 
     
@@ -28,7 +53,7 @@ class node:
         return self.id
     
     def get_label(self):
-        return self.label
+        return self.text if self.op == OTHER else LABELS[self.op]
     
     def get_parents(self):
         return self.parents
@@ -40,7 +65,8 @@ class node:
         self.id = id
     
     def set_label(self, label):
-        self.label = label
+        self.op = opcode(label)
+        self.text = label if self.op == OTHER else None
     
     def set_children(self , children):
         self.children = children
@@ -48,6 +74,8 @@ class node:
     def set_parents(self, parents):
         self.parents = parents
     
+    label = property(get_label, set_label)
+    
     
     ###Adding and removing
     
@@ -104,7 +132,7 @@ class node:
     def __eq__(self,g):
         if type(self)!=type(g):
             return False
-        return self.id == g.get_id() and self.label == g.get_label() and self.children == g.get_children() and self.parents == g.get_parents()
+        return self.id == g.get_id() and self.op == g.op and self.text == g.text and self.children == g.get_children() and self.parents == g.get_parents()
     def __ne__(self,g):
         return not self.__eq__(g)
     
@@ -135,19 +163,19 @@ class node:
         return self.indegree()+self.outdegree()
     
     def is_copy(self):
-        return self.label == ""
+        return self.op == COPY
     
     def is_or(self):
-        return self.label == "|"
+        return self.op == OR
     
     def is_and(self):
-        return self.label == "&"
+        return self.op == AND
     
     def is_not(self):
-        return self.label == "~"
+        return self.op == NOT
     
     def is_xor(self):
-        return self.label == "^"
+        return self.op == XOR
     
     def is_constant(self):
         return self.label == 1 or self.label == 0
@@ -193,7 +221,7 @@ class node:
             -----------
             circuit (bool_circ) : the boolean circuit that contains self
             
-            outputs (list) : a list of ids representing the outputs that have yet to be calculated in the main evaluate() function
+            outputs (set) : the ids of the outputs that have yet to be calculated in the main evaluate() function
             
             Returns:
             --------
@@ -236,6 +264,8 @@ class node:
 
 
 class circuit_node(node):
+    __slots__ = ()
+    
     @classmethod
     def from_node(cls,node):
         """
@@ -279,6 +309,7 @@ class circuit_node(node):
         pass
 
 class copy_node(circuit_node):
+    __slots__ = ()
     
     def __init__(self , identity, parents , children):
         super().__init__(identity,"",parents, children)
@@ -289,37 +320,47 @@ class copy_node(circuit_node):
         parents = list(self.get_parents())
         children = list(self.get_children())
             
-        if len(children) == 1:  #gets rid of unecessary copy node forming chains
-            circuit.remove_node_by_id(self.get_id())
-            circuit.add_edge(parents[0],children[0])
-            return True
+        if len(children) == 1 and len(parents) == 1:  #gets rid of unecessary copy node forming chains
+            return circuit.copy_chain(self.get_id())
         else:
+            #or/and gates among the children, indexed by their only child, to find absorptions in linear time
+            ors_above = {}
+            ands_above = {}
+            for c in children:
+                c_node = circuit.get_node_by_id(c)
+                if c_node.is_or() and len(c_node.get_children()) == 1:
+                    ors_above[list(c_node.get_children())[0]] = c
+                elif c_node.is_and() and len(c_node.get_children()) == 1:
+                    ands_above[list(c_node.get_children())[0]] = c
+            
             for c in children:
+                if c not in circuit.get_node_ids():   #removed by a previous absorption
+                    continue
                 c_node = circuit.get_node_by_id(c)
                 if  c_node.is_copy():
                     r=circuit.assoc_copy(self.get_id(),c)        
                 elif c_node.is_xor():
                     r=circuit.involution_xor(c,self.get_id())
                     
-                #necessary for absorptions, heavy time-complexity wise
+                #x & (x | y) = x
                 elif c_node.is_and():
                     r = circuit.idempotance_and(c,self.get_id())
-                    for other_node_id in children:
-                        if other_node_id in circuit.get_node_ids():
-                            other_node = circuit.get_node_by_id(other_node_id)
-                            if other_node_id != c and other_node.is_or() and list(other_node.get_children())[0] == c_node:
-                                r = circuit.absoroption_and(self.get_id() ,list(other_node.get_children())[0],other_node_id )
+                    other_node_id = ors_above.get(c)
+                    if other_node_id in circuit.get_node_ids() and c in circuit.get_node_by_id(other_node_id).get_children() \
+                        and self.get_id() in circuit.get_node_by_id(other_node_id).get_parents():
+                        r = circuit.absoroption_and(self.get_id(), other_node_id, c)
                 
+                #x | (x & y) = x
                 elif c_node.is_or():
-                    for other_node_id in children:
-                        if other_node_id in circuit.get_node_ids():
-                            r = circuit.idempotance_or(c,self.get_id())
-                            other_node = circuit.get_node_by_id(other_node_id)
-                            if other_node_id != c and other_node.is_and() and list(other_node.get_children())[0] == c_node:
-                                r = circuit.absoroption_or(self.get_id() ,list(other_node.get_children())[0],other_node_id)
+                    r = circuit.idempotance_or(c,self.get_id())
+                    other_node_id = ands_above.get(c)
+                    if other_node_id in circuit.get_node_ids() and c in circuit.get_node_by_id(other_node_id).get_children() \
+                        and self.get_id() in circuit.get_node_by_id(other_node_id).get_parents():
+                        r = circuit.absoroption_or(self.get_id(), c, other_node_id)
         return r
 
 class and_node(circuit_node):
+    __slots__ = ()
     
     def __init__(self , identity, parents , children):
         super().__init__(identity,"&",parents, children)
@@ -337,6 +378,7 @@ class and_node(circuit_node):
         return r
 
 class or_node(circuit_node):
+    __slots__ = ()
     
     def __init__(self , identity, parents , children):
         super().__init__(identity,"|",parents, children)
@@ -353,6 +395,7 @@ class or_node(circuit_node):
 
 
 class not_node(circuit_node):
+    __slots__ = ()
     
     def __init__(self , identity, parents , children):
         super().__init__(identity,"~",parents, children)
@@ -374,6 +417,7 @@ class not_node(circuit_node):
         return r
     
 class xor_node(circuit_node):
+    __slots__ = ()
     
     def __init__(self , identity, parents , children):
         super().__init__(identity,"^",parents, children)
@@ -398,6 +442,7 @@ class xor_node(circuit_node):
 
 
 class constant_node(circuit_node):
+    __slots__ = ()
     def __init__(self , identity,inp, parents , children):
         assert inp == "0" or inp == "1"
         super().__init__(identity,inp,parents, children)
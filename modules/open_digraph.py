@@ -1,10 +1,14 @@
 import random
+from itertools import chain
 import os
 import sys
-sys.path[0] = os.path.abspath(os.path.join(sys.path[0], '..'))
 from modules.open_digraph_paths_distance_mx import open_digraph_paths_distance
 from modules.open_digraph_composition_mx import open_digraph_composition
 from modules.node import *
+from modules.id_allocator import id_allocator
+from modules.port_list import port_list
+from modules.frozen_digraph import frozen_digraph
+from modules.dot_parser import dot_parser
 from modules.matrix_operations import *
 
 
@@ -12,6 +16,8 @@ from modules.matrix_operations import *
 
 class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for open directed graph
     
+    debug_well_formedness = False   #if True, is_well_formed always audits the whole graph instead of the modified nodes
+    
     
     ###Constructor 
     
@@ -22,9 +28,18 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         outputs: int list; the ids of the output nodes
         nodes: node iter;
         """
-        self.inputs = inputs
-        self.outputs = outputs
+        self.inputs = port_list(inputs)     #the lists are copied, with a hash index of their ids
+        self.outputs = port_list(outputs)
         self.nodes = {node.id:node for node in nodes} 
+        self.allocator = id_allocator()
+        self.touched = None   #set of the ids modified since it was last emptied, None when not watched
+        self.edge_balance = None   #number of edges added minus edges removed since it was reset, None when not watched
+        self.version = 0      #incremented on every modification, the caches computed on an older version are stale
+        self.topo_cache = None
+        self.topo_order = None   #position of every node in a topological order kept up to date by add_edge, None if unknown or cyclic
+        self.next_order = 0
+        self.violations = None   #ids of the nodes breaking the invariants, None if unknown (a full audit is needed)
+        self.dirty = set()       #ids of the nodes modified since the violations were last updated
         self.assert_is_well_formed()
 
     def __eq__(self, g):
@@ -32,11 +47,12 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
             return False
         if len(self.outputs) != len(g.get_outputs_ids()):
             return False
+        inputs, outputs = set(g.get_inputs_ids()), set(g.get_outputs_ids())
         for i in self.inputs:
-            if i not in g.get_inputs_ids():
+            if i not in inputs:
                 return False
         for j in self.outputs:
-            if j not in g.get_outputs_ids():
+            if j not in outputs:
                 return False
         # Check if nodes are equal
         if len(self.nodes) != len(g.get_id_node_map()):
@@ -77,10 +93,12 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         return [self.nodes[id] for id in ids]
     
     def set_inputs(self , inputs):
-        self.inputs = inputs
+        self.inputs = port_list(inputs)
+        self.touch()
     
     def set_outputs(self , outputs):
-        self.outputs = outputs
+        self.outputs = port_list(outputs)
+        self.touch()
 
     def add_input_id(self , id):
         """
@@ -88,6 +106,7 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         """
         assert id in self.nodes.keys() , "Input Node doesn't exist in graph"
         self.inputs.append(id)
+        self.touch(id)
 
     def add_output_id(self , id):
         """
@@ -95,17 +114,36 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         """
         assert id in self.nodes.keys(), "Ouput Node doesn't exist in graph"
         self.outputs.append(id)
+        self.touch(id)
     
     def new_id(self):
         """
             Generates a new unique id usable in the graph
         """
-        id = 0
-        while id in self.get_node_ids():
-            id+=1
-        return id
+        return self.allocator.new_id(self.nodes)
+    
     
     
+    def touch(self, *ids):
+        """
+            Records that the graph was modified, and that the nodes with the given ids were (added, removed or
+            had edges added or removed)
+        """
+        self.version += 1
+        if self.touched is not None:
+            self.touched.update(ids)
+        if ids == ():   #modified as a whole
+            self.violations = None
+        elif self.violations is not None:
+            self.dirty.update(ids)
+    
+    def relabel(self, id, label):
+        """
+            Changes the label of the node with the given id, letting the graph know about it
+        """
+        self.nodes[id].set_label(label)
+        self.touch(id)
+    
     
     ###Adding and removing edges/nodes
     
@@ -132,6 +170,74 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         n2 = self.get_node_by_id(src)
         n1.add_parent_id(src,m)
         n2.add_child_id(tgt,m)
+        self.touch(src, tgt)
+        if self.edge_balance is not None:
+            self.edge_balance += m
+        order = self.topo_order
+        if order is not None and order[src] >= order[tgt]:
+            self.reorder(src, tgt)
+    
+    def add_to_order(self, id):
+        """
+            Puts a new node without edges at the end of the topological order
+        """
+        if self.topo_order is not None:
+            self.topo_order[id] = self.next_order
+            self.next_order += 1
+    
+    def reorder(self, src, tgt):
+        """
+            Restores the topological order after the edge src -> tgt was added (Pearce-Kelly algorithm) :
+            only the nodes whose position is between the ones of tgt and src are visited and shuffled
+            
+            If the edge closes a cycle the order is forgotten (self.topo_order becomes None)
+            
+            Parameters:
+            -----------
+            src (int) : id of the source node
+            tgt (int) : id of the target node
+            
+            Returns:
+            --------
+            True if the graph is still acyclic, false otherwise
+        """
+        order = self.topo_order
+        lower, upper = order[tgt], order[src]
+        if lower > upper:   #src is already before tgt
+            return True
+        
+        #nodes reachable from tgt that are not after src
+        forward = [tgt]
+        seen = {tgt}
+        stack = [tgt]
+        while stack:
+            for c in self.nodes[stack.pop()].get_children():
+                if c == src:
+                    self.topo_order = None
+                    return False
+                if c not in seen and order[c] < upper:
+                    seen.add(c)
+                    forward.append(c)
+                    stack.append(c)
+        
+        #nodes from which src is reachable that are not before tgt
+        backward = [src]
+        seen = {src}
+        stack = [src]
+        while stack:
+            for p in self.nodes[stack.pop()].get_parents():
+                if p not in seen and order[p] > lower:
+                    seen.add(p)
+                    backward.append(p)
+                    stack.append(p)
+        
+        #the backward nodes take the first of the positions used by both sets, keeping their relative order
+        forward.sort(key = order.get)
+        backward.sort(key = order.get)
+        positions = sorted(order[n] for n in chain(backward, forward))
+        for n, position in zip(chain(backward, forward), positions):
+            order[n] = position
+        return True
     
     
     def add_edges(self , edges , m_list):
@@ -181,6 +287,8 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         new_ID= self.new_id()
         new_node = node(new_ID,label , {} , {})
         self.nodes[new_ID] = new_node
+        self.touch(new_ID)
+        self.add_to_order(new_ID)
         
         
         #Adding the edges from parents and to children
@@ -212,6 +320,9 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         
         s.remove_child_once(tgt)
         t.remove_parent_once(src)
+        self.touch(src, tgt)
+        if self.edge_balance is not None:
+            self.edge_balance -= 1
     
     def remove_parallel_edges(self, src ,tgt):
         """
@@ -230,9 +341,12 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         """
         s = self.get_node_by_id(src)
         t = self.get_node_by_id(tgt)
+        if self.edge_balance is not None:
+            self.edge_balance -= s.get_children().get(tgt, 0)
         
         s.remove_child_id(tgt)
         t.remove_parent_id(src)
+        self.touch(src, tgt)
         
     def remove_node_by_id(self , id):
         """
@@ -254,6 +368,10 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
             self.remove_parallel_edges(pair[0] , pair[1])
         
         del self.nodes[id]
+        self.allocator.release(id)
+        self.touch(id)
+        if self.topo_order is not None:
+            self.topo_order.pop(id, None)
         
     def remove_edges(self , edges):
         """
@@ -309,6 +427,42 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
 
     ### integrity checks
     
+    def node_is_well_formed(self, id):
+        """
+            Checks the invariants of a single node : it is stored under its id and every child has the node as parent
+            and vice-versa with the same multiplicity (a node that doesn't exist anymore breaks no invariant)
+        """
+        node = self.nodes.get(id)
+        if node is None:
+            return True
+        if id != node.get_id():
+            return False
+        for p, m in node.get_parents().items():
+            if p not in self.nodes or self.nodes[p].get_children().get(id) != m:
+                return False
+        for c, m in node.get_children().items():
+            if c not in self.nodes or self.nodes[c].get_parents().get(id) != m:
+                return False
+        return True
+    
+    def well_formedness_violations(self):
+        """
+            Returns the set of ids of the nodes breaking the invariants of node_is_well_formed
+            
+            Only the nodes modified since the last call are checked again (see touch), the whole graph is audited
+            the first time, after the graph was modified as a whole and in debug mode (debug_well_formedness)
+        """
+        if self.violations is None or self.debug_well_formedness:
+            self.violations = {id for id in self.nodes if not self.node_is_well_formed(id)}
+        else:
+            for id in self.dirty:
+                if self.node_is_well_formed(id):
+                    self.violations.discard(id)
+                else:
+                    self.violations.add(id)
+        self.dirty.clear()
+        return self.violations
+    
     def is_well_formed(self):
         """
             Checks if the graph is well formed 
@@ -335,20 +489,7 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
                 return False
             
         #checks if every child has the node in question as his parent and vice-versa
-        for key , node in self.nodes.items():
-            if key != node.get_id():
-                return False
-
-            parents = self.get_nodes_by_ids(node.get_parents().keys())
-            for p in parents:
-                if p.get_children()[key] != node.get_parents()[p.get_id()]:
-                    return False
-            
-            children = self.get_nodes_by_ids(node.get_children().keys())
-            for c in children:
-                if c.get_parents()[key] != node.get_children()[c.get_id()]:
-                    return False
-        return True
+        return len(self.well_formedness_violations()) == 0
     
     def assert_is_well_formed(self):
         assert self.is_well_formed() , "The graph is not well formed."
@@ -381,7 +522,12 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         new_nodes =[node.copy() for node in self.nodes.values()]
         new_inputs = self.inputs.copy()
         new_outputs = self.outputs.copy()
-        return open_digraph(new_inputs, new_outputs , new_nodes)
+        g = open_digraph(new_inputs, new_outputs , new_nodes)
+        g.allocator = self.allocator.copy()
+        if self.topo_order is not None:
+            g.topo_order = self.topo_order.copy()
+            g.next_order = self.next_order
+        return g
 
     def __str__(self):
         s =  f"*********Graph*********\nInputs : {self.inputs}\nOutputs : {self.outputs}\nNodes :\n "
@@ -404,6 +550,14 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         return d
     
     
+    def freeze(self):
+        """
+            Returns an immutable compressed sparse row snapshot of the graph (see frozen_digraph)
+            on which the read-only algorithms run without going through the nodes' dictionaries
+        """
+        return frozen_digraph.from_open_digraph(self)
+    
+    
     #3#
     def adjacency_matrix(self):
         """
@@ -445,6 +599,8 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
         graph = cls.empty()
         nodelistIDS= {i:node(i,"",{},{}) for i in range(len(mat[0]))}
         graph.nodes= nodelistIDS
+        graph.touch()
+        graph.topo_order = None   # nodes set by hand, the order is built by is_acyclic
         N = range(len(mat[0]))
         for i in N:
             for j in N:
@@ -517,61 +673,89 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
                 .dot file representing the graph
         """
         assert path[-4:] == ".dot", "Not the right extension"
-        s = "digraph G {\n    rankdir=TB;\n\n"
+        with open(path, "w") as f:
+            self.write_dot(f, verbose)
+
+    def write_dot(self, f, verbose = True, lines_per_write = 4096):
+        """
+            Writes the graph in the .dot format of save_as_dot_file to a file-like object, a block of lines at a time
+            so that the whole document is never held in memory
+
+            Parameters:
+            -----------
+            f : any object with a write(str) method (opened file, io.StringIO, socket file...)
+
+            Optional:
+            verbose (bool) default=True : as in save_as_dot_file
+            lines_per_write (int) default=4096 : number of lines joined before every call to f.write
+        """
+        block = []
+        for line in self.dot_lines(verbose):
+            block.append(line)
+            if len(block) == lines_per_write:
+                f.write("".join(block))
+                block.clear()
+        f.write("".join(block))
+
+    def dot_lines(self, verbose = True):
+        """
+            Generates the .dot document of save_as_dot_file one chunk (a line or two) at a time, in linear time
+
+            Parameters:
+            -----------
+            Optional:
+            verbose (bool) default=True : as in save_as_dot_file
+
+            Returns:
+            --------
+            a generator of str whose concatenation is the document
+        """
+        nodes = self.nodes
+        inputs = set(self.inputs)
+        outputs = set(self.outputs)
+
+        yield "digraph G {\n    rankdir=TB;\n\n"
 
         # Taking care of inputs
-        s += "    {\n        rank = same;\n"
-        for iden in self.get_inputs_ids():
-            if iden in self.get_node_ids():
-                node = self.get_node_by_id(iden)
-                s += f'        v{iden} [label="{node.get_label()}'
-                if verbose:
-                    s+= f'\id={iden}'
-                s+='", shape=none, input=True, output=False, color=green];\n'
-        s += "    }\n\n"
+        yield "    {\n        rank = same;\n"
+        for iden in self.inputs:
+            if iden in nodes:
+                ident = f'\\id={iden}' if verbose else ''
+                yield f'        v{iden} [label="{nodes[iden].get_label()}{ident}", shape=none, input=True, output=False, color=green];\n'
+        yield "    }\n\n"
 
         # Nodes
-        for iden, node in self.nodes.items():
-            if iden in self.get_inputs_ids() or iden in self.get_outputs_ids():
+        for iden, node in nodes.items():
+            if iden in inputs or iden in outputs:
                 continue
-            if node.get_label()=="":
-                s += f'    v{iden} [label="'
-                if verbose:
-                    s+= f'{iden}'
-                s+= f'", shape=circle, width=0.4, height=0.4, fixedsize=true, input=False, output=False];\n'
+            label = node.get_label()
+            if label == "":
+                ident = f'{iden}' if verbose else ''
+                yield f'    v{iden} [label="{ident}", shape=circle, width=0.4, height=0.4, fixedsize=true, input=False, output=False];\n'
             else:
-                s += f'    v{iden} [label="{node.get_label()}'
-                if verbose:
-                    s+= f'\nid={iden}'
-                s+=f'", input=False, output=False];\n'
-                
+                ident = f'\nid={iden}' if verbose else ''
+                yield f'    v{iden} [label="{label}{ident}", input=False, output=False];\n'
 
         # Outputs
-        s += "\n    {\n        rank = same;\n"
-        for iden in self.get_outputs_ids():
-            if iden in self.get_node_ids():
-                node = self.get_node_by_id(iden)
-                s += f'        v{iden} [label="{node.get_label()}'
-                if verbose:
-                    s+= f'\nid={iden}'
-                s+='", shape=none, input=False, output=True, color=red];\n'
-        s += "    }\n"
-
-        # Adding edges
-        for iden, node in self.get_id_node_map().items():
-            for child in node.get_children():
-                s += f"    v{iden} -> v{child}"
-                if iden in self.get_inputs_ids():
-                    s += "[color=green]"
-                elif child in self.get_outputs_ids():
-                    s += "[color=red]"
-                s += ";\n"
-            
-
-        s += "}\n"
+        yield "\n    {\n        rank = same;\n"
+        for iden in self.outputs:
+            if iden in nodes:
+                ident = f'\nid={iden}' if verbose else ''
+                yield f'        v{iden} [label="{nodes[iden].get_label()}{ident}", shape=none, input=False, output=True, color=red];\n'
+        yield "    }\n"
 
-        with open(path, "w") as f:
-            f.write(s)
+        # Adding edges, once for every unit of multiplicity
+        for iden, node in nodes.items():
+            is_input = iden in inputs
+            for child, m in node.get_children().items():
+                if is_input:
+                    yield f"    v{iden} -> v{child}[color=green];\n" * m
+                elif child in outputs:
+                    yield f"    v{iden} -> v{child}[color=red];\n" * m
+                else:
+                    yield f"    v{iden} -> v{child};\n" * m
+
+        yield "}\n"
 
 
 
@@ -611,90 +795,67 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
 
             Return:
             -------
-                .dot file representing the graph
+                the graph (of the class cls) read by read_dot
             
         """
         assert path[-4:] == ".dot" , "Not the right extension"
-        f = open(path, "r")
-        text  = f.read()
-        g = open_digraph([], [] , {})
-        st = text.index("{")
-        end = text.index("}")
-        assert st != -1 and end != -1 , "Invalid File , no {}"
-        text = text[st+1 : end]
-        elements = text.split(";")
-        nodes_dict = {}  # dict from nodes names to their ids in the graph
-        for e in elements:
-            if "[" in e: #attributs handling
-                bracketstart = e.index("[")
-                bracketend = e.index("]")
-                if bracketstart != -1:
-                    node_name = e[:bracketstart].strip()
-                    att_val_liste = [(attribute.split("=")[0] ,attribute.split("=")[1].replace("\"" , "") ) for attribute in e[bracketstart+1 : bracketend].split(",")]
-                    for pair in att_val_liste:
-                        lab = ""
-                        inp = out = False
-                        if pair[0] == "label":
-                            lab = pair[1]
-                        elif pair[0] == "input":
-                            inp = True
-                        elif  pair[0] == "output":
-                            out = True
-                        assert not (inp and out) , "The node is both an input and output node"
-                        nid = g.add_node(label= lab)
-                        if inp:
-                            g.add_input_id(nid)
-                        if out:
-                            g.add_input_id(nid)
-                        nodes_dict[node_name] = nid
-            elif "->" in e:  # edges handling
-                chain = e.strip().split(" -> ")
-                parent = chain[0]
-                children = chain[1:]
-                if parent not in nodes_dict.keys():
-                    parent_id = g.add_node()
-                    nodes_dict[parent] = parent_id
-                for child in children:
-                    if child not in nodes_dict.keys():
-                        child_id = g.add_node()
-                        nodes_dict[child] = child_id
-                    g.add_edge(nodes_dict[parent],nodes_dict[child])
-        return g
+        with open(path, "r") as f:
+            return cls.read_dot(f)
+
+    @classmethod
+    def read_dot(cls, f, chunk_size = 1<<16):
+        """
+            Reads a graph in the .dot format from a file-like object, a chunk at a time and in a single pass
+
+            The files written by save_as_dot_file are read back identically (ids, labels, order of the inputs and
+            outputs, multiplicities), in verbose mode too. The nodes of other files get the smallest unused ids
+            and the label of their label attribute.
+
+            Parameters:
+            -----------
+            f : any object with a read(int) method returning str
+
+            Optional:
+            chunk_size (int) default=2**16 : number of characters read at once
+
+            Returns:
+            --------
+            the graph, built at once from all its nodes
+        """
+        inputs, outputs, nodes = dot_parser(f, chunk_size).graph()
+        g = open_digraph(inputs, outputs, nodes)
+        return g if cls is open_digraph else cls(g)
 
     def is_acyclic(self):
         """
-            Checks if the graph is acyclic using the Depth-First-Search algorithm
+            Checks if the graph is acyclic
+            
+            It is known without any computation while the topological order maintained by add_edge exists,
+            otherwise the nodes without parents are removed one after the other (Kahn's algorithm, with an explicit stack
+            so that the depth of the graph doesn't matter) and the order is rebuilt if the graph is acyclic
             
             Returns:
             --------
             True if the graph is acyclic, false otherwise
         """
-        visited = set()
-        stack = set()
-
-        def dfs(node):
-            if node.get_id() in stack:   #i.e if the node was encounterd twice before visiting all its children 
-                return False
-            if node.get_id() in visited:
-                return True
-
-            visited.add(node.get_id())
-            stack.add(node.get_id())
-
-            children = node.get_children()
-            for child_id in children:   # explore children
-                if not dfs(self.nodes[child_id]):
-                    return False  # Cycle detected
-
-            stack.remove(node.get_id())
+        if self.topo_order is not None:
             return True
-
-        for id in self.nodes:
-            if id not in visited:
-                if not dfs(self.nodes[id]):
-                    return False  # Cycle detected
-
-        return True  # No cycle found
+        count = {id: len(node.get_parents()) for id, node in self.nodes.items()}
+        stack = [id for id, c in count.items() if c == 0]
+        order = {}
+        while stack:
+            id = stack.pop()
+            order[id] = len(order)
+            for child_id in self.nodes[id].get_children():
+                count[child_id] -= 1
+                if count[child_id] == 0:
+                    stack.append(child_id)
+
+        if len(order) < len(self.nodes):   # the nodes left are on a cycle or below one
+            return False
+        self.topo_order = order
+        self.next_order = len(order)
+        return True
 
     #6#
     @classmethod
@@ -726,11 +887,15 @@ class open_digraph(open_digraph_paths_distance,open_digraph_composition): # for
             componentMat[dict_[i]].append(self.nodes[i])    # one row for every connected component
         
         
+        # updating input and output lists for every component
+        component_input = [[] for i in range(nb)]
+        component_output = [[] for i in range(nb)]
+        for inp in self.get_inputs_ids():
+            component_input[dict_[inp]].append(inp)
+        for out in self.get_outputs_ids():
+            component_output[dict_[out]].append(out)
         for i in range(nb):
-            # updating input and output lists for every component
-            component_input = [inp for inp in self.get_inputs_ids() if dict_[inp]==i]
-            component_output = [out for out in self.get_outputs_ids() if dict_[out]==i]
-            componentMat[i] = open_digraph(component_input , component_output , componentMat[i])
+            componentMat[i] = open_digraph(component_input[i] , component_output[i] , componentMat[i])
         return componentMat
     
     
@@ -1,3 +1,4 @@
+from itertools import chain
 class open_digraph_composition:
     def min_id(self):
         """
@@ -55,9 +56,13 @@ class open_digraph_composition:
             for i in range(len(self.outputs)):
                 self.outputs[i] += n
         self.nodes = shift_keys(self.nodes, n)
+        self.allocator.reset()
+        self.touch()
+        if self.topo_order is not None:
+            self.topo_order = shift_keys(self.topo_order, n)
     
     #6#
-    def iparallel(self, g):
+    def iparallel(self, g, disjoint=False):
         """
             Appends the graph g in parallel to the current graph 
             
@@ -65,28 +70,43 @@ class open_digraph_composition:
             -----------
 
             g (open_digraph) : a graph that is going to be added in parallel
+
+            Optional:
+            disjoint (bool) default=False : if True the ids of g must not be used in the current graph (for instance
+                                            when both were built with different id bases), nothing is shifted and
+                                            the cost is O(|g|) whatever the size of the current graph
             
             Output: (inplace)
             -------
             
             the current graph will now be composed of it's former structure plus the graph g next to it
         """
-        minId1 = self.min_id()
-        maxId2 = g.max_id()
-        
-        self.shift_indices(-minId1+maxId2+1)   # avoiding conflicting ids with shift
+        if disjoint:
+            shift = 0
+        else:
+            shift = -self.min_id()+g.max_id()+1
+            self.shift_indices(shift)   # avoiding conflicting ids with shift
+        nodes = self.nodes
         for key,nnode in g.get_id_node_map().items():   # adding the nodes of g
-            self.nodes[key]= nnode.copy()
+            assert key not in nodes, "error, ids of the graphs are not disjoint."
+            nodes[key]= nnode.copy()
+        self.touch(*g.get_node_ids())
+        if self.topo_order is not None and g.topo_order is not None:   # the nodes of g go after the ones of self
+            for key,position in g.topo_order.items():
+                self.topo_order[key] = self.next_order + position
+            self.next_order += g.next_order
+        else:
+            self.topo_order = None
         for j in g.get_inputs_ids():
             self.add_input_id(j)
         for i in g.get_outputs_ids():
             self.add_output_id(i)
         #return the the int that shifted the indices to use it elsewhere like in adder functions
-        return -minId1+maxId2+1
+        return shift
 
     #6#
     @classmethod
-    def parallel(cls,first, g):
+    def parallel(cls,first, g, disjoint=False):
         """
             Appends the graph g in parallel to the current graph 
             
@@ -94,6 +114,7 @@ class open_digraph_composition:
             -----------
 
             g (open_digraph) : a graph that is going to be added in parallel
+            disjoint (bool) default=False : same as in iparallel
             
             Return: 
             -------
@@ -101,11 +122,11 @@ class open_digraph_composition:
             A graph that will now be composed of current graph plus the graph g next to it
         """
         c = first.copy()
-        c.iparallel(g)
+        c.iparallel(g, disjoint)
         return c
 
     #6#
-    def icompose(self, f):
+    def icompose(self, f, disjoint=False):
         """
             Appends the graph f sequentially to the current graph connecting the inputs of self to the outputs of f
             
@@ -113,6 +134,9 @@ class open_digraph_composition:
             -----------
 
             f (open_digraph) : a graph to which self will be added in sequence
+
+            Optional:
+            disjoint (bool) default=False : same as in iparallel, only the inputs of self are rewired
             
             Output: (inplace)
             -------
@@ -121,15 +145,19 @@ class open_digraph_composition:
         """
         assert len(f.get_outputs_ids()) == len(self.get_inputs_ids()) , "error, domains don't match."
         
-        minMAx = self.iparallel(f) 
+        nb_inputs = len(self.get_inputs_ids())
+        nb_outputs = len(self.get_outputs_ids())
+        minMAx = self.iparallel(f, disjoint) 
         
-        old_input = [inp for inp in self.get_inputs_ids() if inp not in f.get_inputs_ids()] #inputs that used to belong to self after shift
+        old_input = self.get_inputs_ids()[:nb_inputs] #inputs that used to belong to self after shift
         
         # merging in sequence
         for k,f_out in enumerate(f.get_outputs_ids()):
             child_dict = self.get_node_by_id(old_input[k]).get_children()
             self.get_node_by_id(f_out).set_children(child_dict)
             self.get_node_by_id(old_input[k]).set_children({})
+            self.touch(f_out, *child_dict)
+            self.topo_order = None   # edges rewired by hand, the order is rebuilt by is_acyclic
             for i in child_dict:
                 parents_of_child = self.get_node_by_id(i).get_parents()
                 multiplicity_of_old_parent = parents_of_child.pop(old_input[k])
@@ -137,21 +165,14 @@ class open_digraph_composition:
             self.remove_node_by_id(old_input[k])
         
         
-        # updating inputs and outputs lists
-        inps = list(self.get_inputs_ids()).copy()
-        for inp in inps:
-            if inp not in f.get_inputs_ids():
-                self.get_inputs_ids().remove(inp)
-                
-        outs = list(self.get_outputs_ids()).copy()
-        for out in outs:
-            if out in f.get_outputs_ids():
-                self.get_outputs_ids().remove(out)
+        # updating inputs and outputs lists : iparallel appended the ones of f after the ones of self
+        del self.get_inputs_ids()[:nb_inputs]
+        del self.get_outputs_ids()[nb_outputs:]
         return minMAx
 
     #6#
     @classmethod
-    def compose(cls ,first, f):
+    def compose(cls ,first, f, disjoint=False):
         """
             Appends the graph f sequentially to the current graph connecting the inputs of self to the outputs of f
             
@@ -159,6 +180,7 @@ class open_digraph_composition:
             -----------
 
             f (open_digraph) : a graph to which self will be added in sequence
+            disjoint (bool) default=False : same as in iparallel
             
             Return: 
             -------
@@ -166,7 +188,7 @@ class open_digraph_composition:
             A graph that will now be composed of f followed by the former self in sequence
         """
         c = first.copy()
-        c.icompose(f)
+        c.icompose(f, disjoint)
         return c
 
     #6#
@@ -178,31 +200,20 @@ class open_digraph_composition:
             --------
             A tuple (int , dict) : the number of connecter components / a dictionary with all the nodes as ids and their respective connected component
         """
-        visited = set()
         nb = 0
         component_dict = {}
-
-
-        def dfs(node):
-            if node.get_id() in visited: # i.e if all children explored, add node to the current connected component
-                component_dict[node.get_id()] = nb 
-            
-            else:
-                visited.add(node.get_id())
-                children = node.get_children()
-                parents = node.get_parents()
-                for child_id in children:
-                    dfs(self.nodes[child_id])
-                    component_dict[child_id] = nb 
-                for parent_id in parents:
-                    dfs(self.nodes[parent_id])
-                    component_dict[parent_id] = nb # adds child after exploring the connected component it belongs to
-
-                
         
-        for node in self.nodes.values():
-            if node.get_id() not in visited:
-                dfs(node)
+        for id in self.nodes:
+            if id not in component_dict:
+                # explores the connected component of id with an explicit stack
+                component_dict[id] = nb
+                stack = [id]
+                while stack:
+                    node = self.nodes[stack.pop()]
+                    for neighbour_id in chain(node.get_children(), node.get_parents()):
+                        if neighbour_id not in component_dict:
+                            component_dict[neighbour_id] = nb
+                            stack.append(neighbour_id)
                 nb +=1
         return (nb , component_dict)
     
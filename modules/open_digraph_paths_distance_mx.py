@@ -1,10 +1,30 @@
-import sys
+import heapq
+from collections import deque
+from itertools import chain
 class open_digraph_paths_distance:
         
-    def dijkstra(self, src_node , direction = 0,tgt = None):
+    def neighbours(self, node_ID, direction):
+        """
+            Returns the neighbours of a node in the given direction as (id, multiplicity) pairs, without copying any dictionary
+
+            Parameters:
+            -----------
+            node_ID (int) : the id of the node
+            direction (int) : 0 for the parents and the children, 1 for the children only, -1 for the parents only
+        """
+        nnode = self.get_node_by_id(node_ID)
+        if direction == 1:
+            return nnode.get_children().items()
+        elif direction == -1:
+            return nnode.get_parents().items()
+        return chain(nnode.get_children().items(), nnode.get_parents().items())
+    
+    def dijkstra(self, src_node , direction = 0,tgt = None, weighted = False):
         """
             dijkstra's algorithm to find the shortest path from a node to any other node
 
+            With unit weights it is a breadth first search, otherwise a dijkstra with a binary heap.
+
             Parameters:
             -----------
             src_node, the node source.
@@ -12,6 +32,8 @@ class open_digraph_paths_distance:
                 direction = 0: bidirectional graph (both directions).
                 direction = 1: search only children.
                 direction = -1: search only parents.
+            tgt: the search stops once the distance to tgt is known
+            weighted (bool) default=False: if True the multiplicity of an edge is its length, otherwise every edge has length 1
 
             Returns:
             --------
@@ -19,38 +41,119 @@ class open_digraph_paths_distance:
             the first indicating the length of the path to each node from the source node.
             the seconf indicating the previous node before arriving to the wanted node.
         """
-        Q = [src_node]
         dist = {src_node:0}
         prev = {}
-        while Q != []:
-            shortest = sys.maxsize
-            u = -1
-            for node in Q:
-                if dist[node] <= shortest:
-                    shortest = dist[node]
-                    u = node
-            if u == tgt:  #Early stoppage if min dist to tgt has been calculated
+        if not weighted:
+            Q = deque([src_node])
+            while Q:
+                u = Q.popleft()
+                if u == tgt:  #Early stoppage if min dist to tgt has been calculated
+                    return dist,prev
+                for nei, m in self.neighbours(u, direction):
+                    if nei not in dist:
+                        dist[nei] = dist[u] + 1
+                        prev[nei] = u
+                        Q.append(nei)
+            return dist,prev
+        
+        Q = [(0, src_node)]
+        done = set()
+        while Q:
+            d, u = heapq.heappop(Q)
+            if u in done:   #outdated entry, u was reached by a shorter path since it was pushed
+                continue
+            done.add(u)
+            if u == tgt:
                 return dist,prev
-            Q.remove(u)
-            if direction == 1:
-                new_dict =self.get_node_by_id(u).get_children()
-            elif direction == -1:
-                new_dict = self.get_node_by_id(u).get_parents()
-            else :
-                new_dict = self.get_node_by_id(u).get_children().copy()
-                new_dict.update(self.get_node_by_id(u).get_parents().copy())
-            for nei in list(new_dict.keys()):
-                if nei not in dist.keys():
-                    Q.append(nei)
-                if nei not in dist or dist[nei]> dist[u]+1:
-                    dist[nei] = dist[u] + 1
+            for nei, m in self.neighbours(u, direction):
+                if nei not in dist or dist[nei] > d + m:
+                    dist[nei] = d + m
                     prev[nei] = u
+                    heapq.heappush(Q, (d + m, nei))
         return dist,prev
     
+    def bidirectional_distance(self, u, v, direction = 0):
+        """
+            Length of the shortest path from u to v (unit weights) by breadth first searches from both ends,
+            the layer of the smallest frontier being expanded until they meet
+
+            Parameters:
+            -----------
+            u (int) : the id of the source node
+            v (int) : the id of the target node
+            direction (int) default=0 : as in dijkstra, the search from v goes in the opposite direction
 
+            Returns:
+            --------
+            int , the distance from u to v or None if v can't be reached
+        """
+        if u == v:
+            return 0
+        dist = [{u:0}, {v:0}]
+        frontier = [[u], [v]]
+        directions = [direction, -direction]
+        while frontier[0] != [] and frontier[1] != []:
+            side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+            mine, other = dist[side], dist[1-side]
+            best = None
+            next_frontier = []
+            for x in frontier[side]:
+                for nei, m in self.neighbours(x, directions[side]):
+                    if nei in other:
+                        length = mine[x] + 1 + other[nei]
+                        if best is None or length < best:
+                            best = length
+                    if nei not in mine:
+                        mine[nei] = mine[x] + 1
+                        next_frontier.append(nei)
+            if best is not None:   #the whole layer was expanded so no shorter path meets later
+                return best
+            frontier[side] = next_frontier
+        return None
     
     def shortest_path(self , u , v):
-        return self.dijkstra( u , direction = 0,tgt = v)[0][v]  #dist[v] with u as source node
+        d = self.bidirectional_distance(u, v)
+        if d is None:
+            raise KeyError(v)   #v isn't in the connected component of u
+        return d
+    
+    def input_output_distances(self, direction = 0):
+        """
+            Lengths of the shortest paths between every input and every output (unit weights),
+            with one breadth first search per input over the frozen adjacency lists of the graph
+
+            Parameters:
+            -----------
+            direction (int) default=0 : as in dijkstra, 1 to follow the edges from the inputs towards the outputs
+
+            Returns:
+            --------
+            A (number of inputs, number of outputs) numpy float array, np.inf where there is no path
+        """
+        import numpy as np
+        frozen = self.freeze()
+        neighbours = frozen.adjacency_lists(direction)
+        outputs = frozen.outputs.tolist()
+        output_columns = {}
+        for j, o in enumerate(outputs):
+            output_columns.setdefault(o, []).append(j)
+        
+        result = np.full((len(frozen.inputs), len(outputs)), np.inf)
+        for i, src in enumerate(frozen.inputs.tolist()):
+            row = result[i]
+            left = len(output_columns)   #outputs not reached yet
+            dist = {src: 0}
+            Q = deque([src])
+            while Q and left > 0:
+                u = Q.popleft()
+                if u in output_columns:
+                    row[output_columns[u]] = dist[u]
+                    left -= 1
+                for v in neighbours[u]:
+                    if v not in dist:
+                        dist[v] = dist[u] + 1
+                        Q.append(v)
+        return result
     
     def distances_from_common_ancestors(self , u ,v):
         distu , prevu = self.dijkstra( u , direction = -1)
@@ -62,42 +165,56 @@ class open_digraph_paths_distance:
                 result[key] = (distu[key] , distv[key])
         return result
     
+    def topological_levels(self):
+        '''
+        topological sorting of a graph with Kahn's algorithm : every node counts its parents that are not sorted yet
+        and goes in the next layer when its count reaches 0, the inputs being considered as already sorted
+
+        the result is cached on the graph until it is modified (see touch)
+
+        Returns:
+        -------
+        list of list (the layers of node ids) , dict {int:int} (node_id:index of its layer, the inputs are not in it)
+        '''
+        key = (self.version, tuple(self.get_inputs_ids()))
+        if self.topo_cache is not None and self.topo_cache[0] == key:
+            return self.topo_cache[1], self.topo_cache[2]
+        
+        nodes = self.get_id_node_map()
+        inputs = set(self.get_inputs_ids())
+        count = {node_ID: len(nnode.get_parents()) for node_ID, nnode in nodes.items()}
+        for inp in inputs:
+            for child in nodes[inp].get_children():
+                count[child] -= 1
+        layer = [node_ID for node_ID, c in count.items() if c == 0 and node_ID not in inputs]
+        stack = []
+        levels = {}
+        while layer != []:
+            for node_ID in layer:
+                levels[node_ID] = len(stack)
+            stack.append(layer)
+            next_layer = []
+            for node_ID in layer:
+                for child in nodes[node_ID].get_children():
+                    count[child] -= 1
+                    if count[child] == 0 and child not in inputs:
+                        next_layer.append(child)
+            layer = next_layer
+        assert len(levels) + len(inputs) >= len(nodes), "graph is cyclic"
+        
+        self.topo_cache = (key, stack, levels)
+        return stack, levels
+    
     def topological_sort(self):
         '''
         topological sorting of a graph
 
-        contents:
-        ----------
-        function get_coleave which gets a curretn coleaf from a graph and adds it to a semi_visited node
-        once we get all the current coleafs, we add all the semi_visited elements to visited
+        Returns:
+        -------
+        list of list, the successive layers of node ids : a node is in the first layer where all its parents
+        are in the previous layers or are inputs (which are in no layer)
         '''
-        visited =set(self.get_inputs_ids())
-        stack = []
-        def get_coleave(semi_visit,node_ID,nnode,sub_stack):
-            flag = True
-            for parent in nnode.get_parents():
-                if not (parent in visited):  
-                    flag = False
-            
-            if flag:
-                sub_stack.append(node_ID)
-                semi_visit.append(node_ID)
-                return True
-            return False
-                
-        flag_isthere_coleaf = True
-        while flag_isthere_coleaf and len(visited)<len(self.get_node_ids()):
-            flag_isthere_coleaf = False
-            sub_stack = []
-            semi_visit = []
-            for node_ID in self.get_id_node_map():
-                if node_ID not in visited:
-                    if get_coleave(semi_visit,node_ID,self.get_node_by_id(node_ID),sub_stack):
-                        flag_isthere_coleaf= True
-            stack.append(sub_stack)
-            visited.update(semi_visit)
-        assert (not len(visited)<len(self.get_node_ids())), "graph is cyclic"
-        return stack 
+        return [layer.copy() for layer in self.topological_levels()[0]]
     
     def depth_node_acyclic_knowing_Topological_sort(self,node,stack):
         '''
@@ -132,15 +249,11 @@ class open_digraph_paths_distance:
         -------
         int depth of a node
         '''
-        assert node in self.get_nodes(), "node isn't in graph"
-        stack = self.topological_sort()
-        i = 0
-        while node.get_id() not in stack[i]:
-            i+=1
-        return i+1
+        assert self.get_id_node_map().get(node.get_id()) == node, "node isn't in graph"
+        return self.topological_levels()[1].get(node.get_id(),-1)+1   #the inputs are before the first layer
 
     def depth_acyclic(self):
-        return len(self.topological_sort())
+        return len(self.topological_levels()[0])
     
     def longest_path(self,u,v):
         '''
@@ -158,8 +271,8 @@ class open_digraph_paths_distance:
         '''
         dist = {u:0}
         prev = {u:u}
-        stack = self.topological_sort()
-        u_depth = self.depth_node_acyclic_knowing_Topological_sort(self.get_node_by_id(u),stack)
+        stack, levels = self.topological_levels()
+        u_depth = levels.get(u,-1)+1   #the inputs are before the first layer
         graph_depth = len(stack)
         for i in range(u_depth,graph_depth):
             for j in range(0,len(stack[i])):
@@ -174,3 +287,73 @@ class open_digraph_paths_distance:
                     return dist[w],prev
         return dist[v],prev
 
+    def longest_paths(self, delays = None):
+        '''
+        longest distances from the inputs to every node and from every node to the outputs, computed in one pass
+        over the cached topological sort in each direction (dynamic programming on a DAG)
+
+        Parameters:
+        -----------
+        delays ({str:int}) default=None : the delay of the nodes of every label, crossing a node costs its delay
+                                          (1 for the labels that are not given, 1 for every node if None)
+
+        Returns:
+        -------
+        dict {int:int} (node_id:longest distance from an input, for the nodes reachable from an input) ,
+        dict {int:int} (node_id:previous node on this path) ,
+        dict {int:int} (node_id:longest distance to an output, for the nodes from which an output can be reached) ,
+        dict {int:int} (node_id:next node on this path)
+        '''
+        stack, levels = self.topological_levels()
+        nodes = self.get_id_node_map()
+        if delays is None:
+            delay = {node_ID: 1 for node_ID in nodes}
+        else:
+            delay = {node_ID: delays.get(nnode.get_label(), 1) for node_ID, nnode in nodes.items()}
+        
+        dist = {inp: 0 for inp in self.get_inputs_ids()}
+        prev = {}
+        for layer in stack:
+            for w in layer:
+                for parent in nodes[w].get_parents():
+                    if parent in dist and (w not in dist or dist[parent]+delay[w] > dist[w]):
+                        dist[w] = dist[parent]+delay[w]
+                        prev[w] = parent
+        
+        dist_out = {out: 0 for out in self.get_outputs_ids()}
+        next_ = {}
+        for layer in reversed(stack):
+            for w in layer:
+                for child in nodes[w].get_children():
+                    if child in dist_out and (w not in dist_out or dist_out[child]+delay[child] > dist_out[w]):
+                        dist_out[w] = dist_out[child]+delay[child]
+                        next_[w] = child
+        for inp in self.get_inputs_ids():   #the inputs are in no layer
+            for child in nodes[inp].get_children():
+                if child in dist_out and (inp not in dist_out or dist_out[child]+delay[child] > dist_out[inp]):
+                    dist_out[inp] = dist_out[child]+delay[child]
+                    next_[inp] = child
+        return dist, prev, dist_out, next_
+    
+    def critical_path(self, delays = None):
+        '''
+        the longest path from an input to an output (the depth of a circuit when delays is None)
+
+        Parameters:
+        -----------
+        delays ({str:int}) default=None : as in longest_paths
+
+        Returns:
+        -------
+        int length , list of the node_ids of the path from the input to the output (None , [] if no output can be reached)
+        '''
+        dist, prev, dist_out, next_ = self.longest_paths(delays)
+        reached = [out for out in self.get_outputs_ids() if out in dist]
+        if reached == []:
+            return None, []
+        out = max(reached, key = lambda o: dist[o])
+        path = [out]
+        while path[-1] in prev:
+            path.append(prev[path[-1]])
+        path.reverse()
+        return dist[out], path
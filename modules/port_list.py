@@ -0,0 +1,86 @@
+class port_list(list):
+    """
+        The list of the input or output ids of a graph, with a hash index of its ids
+
+        It is used (and modified inplace) exactly like a list, but testing if an id is in it costs O(1).
+    """
+
+    ###Constructor
+
+    def __init__(self, ids=()):
+        """
+        occurrences: int->int dict; maps every id of the list to its number of occurrences
+        """
+        super().__init__(ids)
+        self.occurrences = {}
+        for id in self:
+            self.occurrences[id] = self.occurrences.get(id, 0) + 1
+
+    def index_add(self, ids):
+        for id in ids:
+            self.occurrences[id] = self.occurrences.get(id, 0) + 1
+
+    def index_remove(self, ids):
+        for id in ids:
+            if self.occurrences[id] == 1:
+                del self.occurrences[id]
+            else:
+                self.occurrences[id] -= 1
+
+
+    ###Lookup
+
+    def __contains__(self, id):
+        return id in self.occurrences
+
+    def __reduce__(self):   #pickled and deep-copied as a plain list, the index is rebuilt by the constructor
+        return (port_list, (list(self),))
+
+
+    ###Modifications
+
+    def append(self, id):
+        super().append(id)
+        self.index_add((id,))
+
+    def extend(self, ids):
+        ids = list(ids)
+        super().extend(ids)
+        self.index_add(ids)
+
+    def __iadd__(self, ids):
+        self.extend(ids)
+        return self
+
+    def insert(self, i, id):
+        super().insert(i, id)
+        self.index_add((id,))
+
+    def remove(self, id):
+        super().remove(id)
+        self.index_remove((id,))
+
+    def pop(self, i=-1):
+        id = super().pop(i)
+        self.index_remove((id,))
+        return id
+
+    def clear(self):
+        super().clear()
+        self.occurrences = {}
+
+    def __setitem__(self, i, value):
+        old = self[i] if isinstance(i, slice) else (self[i],)
+        value = list(value) if isinstance(i, slice) else value
+        super().__setitem__(i, value)
+        self.index_remove(old)
+        self.index_add(value if isinstance(i, slice) else (value,))
+
+    def __delitem__(self, i):
+        old = self[i] if isinstance(i, slice) else (self[i],)
+        super().__delitem__(i)
+        self.index_remove(old)
+
+    def __imul__(self, n):
+        self[:] = list(self) * n
+        return self
@@ -2,9 +2,15 @@ import sys
 import os
 sys.path[0] = os.path.abspath(os.path.join(sys.path[0], '..'))
 import unittest
+import io
+import subprocess
+import numpy as np
 from modules.open_digraph import * 
 from modules.bool_circ import *
 from modules.addition_checkEncode import *
+from modules.hier_circ import *
+from modules.port_list import *
+from benchmarks.harness import *
 
 
 class InitTest(unittest.TestCase):
@@ -18,7 +24,23 @@ class InitTest(unittest.TestCase):
         self.assertEqual(n0.children, {1:1})
         self.assertIsInstance(n0, node)
         self.assertIsNot(n0.copy() , n0)
-            
+
+
+    def test_node_slots(self):
+        n0 = node(0, 'i', {}, {1:1})
+        self.assertFalse(hasattr(n0, "__dict__"))
+        self.assertFalse(hasattr(and_node(1, {}, {}), "__dict__"))
+        self.assertEqual(node(1, 'i', {}, {}).op, n0.op)
+        n0.set_label('&')
+        self.assertEqual(n0.op, AND)
+        self.assertTrue(n0.is_and())
+        n0.label = 'j'
+        self.assertEqual(n0.get_label(), 'j')
+        self.assertEqual(n0.op, OTHER)
+        self.assertNotEqual(n0, node(0, 'k', {}, {1:1}))
+        for i in range(100):   #the other labels are not interned
+            node(i, f'x{i}', {}, {})
+        self.assertEqual(len(LABELS), OTHER)
             
     def test_init_open_digraph(self):
         n0 = [node(0, 'a', {}, {}) , node(1, 'b', {}, {})]
@@ -83,6 +105,24 @@ class InitTest(unittest.TestCase):
         self.assertEqual(g.get_outputs_ids() , [4])
     
     
+    def test_new_id(self):
+        g = open_digraph.empty()
+        ids = [g.add_node() for _ in range(6)]
+        self.assertEqual(ids, list(range(6)))
+        self.assertEqual(g.new_id(), g.new_id())
+        g.remove_nodes_by_id([4,1])
+        self.assertEqual([g.add_node() for _ in range(3)], [1,4,6])
+        g.shift_indices(10)
+        self.assertEqual(g.add_node(), 0)
+        h = g.copy()
+        g.remove_node_by_id(13)
+        self.assertEqual(h.new_id(), 1)
+        self.assertEqual(g.new_id(), 1)
+        g.iparallel(h)
+        new = g.new_id()
+        self.assertNotIn(new, g.get_node_ids())
+        self.assertEqual(new, min(i for i in range(len(g.get_nodes())+1) if i not in g.get_node_ids()))
+
     """
     random.seed() only take int , float , None and Byte as argument in newer python versions thus choosing float values for every call to a matrix creation function
     Giving a function as argument works for version 3.9.6 and older at least
@@ -301,6 +341,194 @@ class InitTest(unittest.TestCase):
 
         self.assertNotEqual(g,empt)
     
+    def test_parallel_disjoint(self):
+        g = open_digraph([0], [2], [node(0, 'a', {}, {1:1}), node(1, 'b', {0:1}, {2:1}), node(2, 'c', {1:1}, {})])
+        h = open_digraph([10], [11], [node(10, 'd', {}, {11:1}), node(11, 'e', {10:1}, {})])
+        self.assertEqual(g.iparallel(h, disjoint=True), 0)
+        self.assertEqual(sorted(g.get_node_ids()), [0,1,2,10,11])
+        self.assertEqual(g.get_inputs_ids(), [0,10])
+        self.assertEqual(g.get_outputs_ids(), [2,11])
+        self.assertTrue(g.is_acyclic())
+        with self.assertRaises(AssertionError):
+            g.iparallel(h, disjoint=True)
+
+        f = open_digraph([20], [21], [node(20, 'x', {}, {21:1}), node(21, 'y', {20:1}, {})])
+        k = open_digraph([0], [2], [node(0, 'a', {}, {1:1}), node(1, 'b', {0:1}, {2:1}), node(2, 'c', {1:1}, {})])
+        m = open_digraph.compose(k, f, disjoint=True)
+        self.assertEqual(m, open_digraph([20], [2], [node(20, 'x', {}, {21:1}), node(21, 'y', {20:1}, {1:1}),
+                                                     node(1, 'b', {21:1}, {2:1}), node(2, 'c', {1:1}, {})]))
+        self.assertEqual(len(k.get_nodes()), 3)
+
+        for n in range(3):   #the halves of the adders are built in disjoint id ranges
+            self.assertEqual(sorted(adders.adder(n).get_node_ids()), list(range(14 * 2**n)))
+
+    def test_hier_circ(self):
+        module, carry_in, carry_out = adders.adder_module(3)
+        self.assertEqual(len(module.modules()), 5)   #one per level plus the flat adder_0
+        self.assertEqual(module.size(), 14 * 2**3)
+        flat = module.flatten()
+        self.assertEqual(sorted(flat.get_node_ids()), list(range(14 * 2**3)))
+        self.assertEqual(flat.get_inputs_ids()[carry_in], adders.adder_helper(3)[1])
+        X = np.random.randint(0, 2, (100, len(flat.get_inputs_ids())))
+        self.assertEqual(module.compile().evaluate_batch(X).tolist(), flat.compile().evaluate_batch(X).tolist())
+
+        f = open_digraph([0], [1], [node(0, 'a', {}, {1:1}), node(1, 'b', {0:1}, {})])
+        g = open_digraph([0,1], [3], [node(0, 'c', {}, {2:1}), node(1, 'd', {}, {2:1}), node(2, 'e', {0:1,1:1}, {3:1}), node(3, 'o', {2:1}, {})])
+        h = hier_circ.compose(g, hier_circ.parallel(f, f))
+        self.assertEqual(h.size(), 8)
+        self.assertEqual(h.flatten(), open_digraph([4,6], [3], [node(0, 'c', {5:1}, {2:1}), node(1, 'd', {7:1}, {2:1}),
+                                                                node(2, 'e', {0:1,1:1}, {3:1}), node(3, 'o', {2:1}, {}),
+                                                                node(4, 'a', {}, {5:1}), node(5, 'b', {4:1}, {0:1}),
+                                                                node(6, 'a', {}, {7:1}), node(7, 'b', {6:1}, {1:1})]))
+        with self.assertRaises(AssertionError):
+            hier_circ.compose(g, f)
+
+    def test_port_list(self):
+        g = open_digraph([0,1], [3], [node(0, 'a', {}, {2:1}), node(1, 'b', {}, {2:1}), node(2, 'c', {0:1,1:1}, {3:1}), node(3, 'd', {2:1}, {})])
+        inputs = g.get_inputs_ids()
+        self.assertIsInstance(inputs, port_list)
+        self.assertIn(1, inputs)
+        inputs.remove(1)
+        self.assertNotIn(1, inputs)
+        inputs += [1, 1]
+        inputs.remove(1)
+        self.assertIn(1, inputs)
+        inputs[1] = 5
+        self.assertEqual(inputs, [0,5])
+        self.assertNotIn(1, inputs)
+        del inputs[:]
+        self.assertNotIn(0, inputs)
+        g.set_inputs([0,1])
+        self.assertIn(0, g.get_inputs_ids())
+        self.assertIsInstance(g.copy().get_inputs_ids(), port_list)
+
+    def test_adder_templates(self):
+        g = adders.adder(2)
+        h = adders.adder(2)
+        self.assertIsNot(g, h)
+        self.assertIsInstance(g, adders)
+        self.assertEqual(g, h)
+        g.get_inputs_ids().pop()
+        g.remove_node_by_id(0)
+        self.assertEqual(h, adders.adder(2))
+        self.assertTrue(adders.adder(2).is_well_formed())
+        k, cin = adders.half_adder(2)
+        self.assertEqual(k.get_node_by_id(cin).get_label(), "0")
+        self.assertIs(adders.compiled("adder", 2), adders.compiled("adder", 2))
+        for a, b in [(0, 0), (13, 2), (255, 255), (1234, 4321)]:
+            self.assertEqual(add_naive(a, b), a+b)
+            self.assertEqual(add_CLA(a, b), a+b)
+            self.assertEqual(add_registre_naive_half(a, b, size=16), a+b)
+
+    def test_prefix_adders(self):
+        for network in adders.prefix_networks:
+            for width in [1, 5, 8, 13]:
+                compiled = adders.prefix_adder(width, network).compile()
+                for _ in range(30):
+                    a, b, cin = random.getrandbits(width), random.getrandbits(width), random.getrandbits(1)
+                    A, B = bool_circ.convert_to_binary_string(a, width), bool_circ.convert_to_binary_string(b, width)
+                    bits = "".join(B[i]+A[i] for i in range(width)) + str(cin)
+                    self.assertEqual(bool_circ.convert_bits_to_int(compiled.evaluate(bits)), a+b+cin)
+            circuit = adders.prefix_adder(64, network)
+            self.assertTrue(circuit.is_well_formed())
+            self.assertLess(circuit.depth_acyclic(), adders.CLA_adder(15).depth_acyclic())
+            self.assertTrue(all(node.get_children() != {} for node in circuit.get_nodes() if node.get_id() not in circuit.get_outputs_ids()))
+
+    def test_benchmarks(self):
+        report = run_benchmarks(["build", "topological_sort", "evaluate_compiled"], sizes=(8, 16), repeat=2, verbose=False)
+        self.assertEqual([(r["case"], r["size"]) for r in report["results"]],
+                         [("build", 8), ("build", 16), ("topological_sort", 8), ("topological_sort", 16),
+                          ("evaluate_compiled", 8), ("evaluate_compiled", 16)])
+        self.assertTrue(all(len(r["times"]) == 2 and r["best"] == min(r["times"]) for r in report["results"]))
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_test.json")
+        save_report(report, path)
+        baseline = load_report(path)
+        os.remove(path)
+        baseline["results"] = baseline["results"][:4]
+        for r in baseline["results"]:
+            r["best"] /= 2   #the baseline was twice as fast
+        slower, faster = compare(report, baseline)
+        self.assertEqual(len(slower), 4)
+        self.assertEqual(faster, [])
+        self.assertTrue(all(abs(r["ratio"] - 2) < 1e-9 for r in slower))
+        self.assertNotIn("ratio", report["results"][4])
+
+    def test_dot_writer(self):
+        g = open_digraph([0],[4],[node(0,'',{},{1:1}), node(1,'&',{0:1},{2:2,3:1}), node(2,'',{1:2},{4:1}),
+                                  node(3,'~',{1:1},{}), node(4,'',{2:1},{})])
+        self.assertEqual("".join(g.dot_lines(verbose=False)),
+            'digraph G {\n    rankdir=TB;\n\n'
+            '    {\n        rank = same;\n        v0 [label="", shape=none, input=True, output=False, color=green];\n    }\n\n'
+            '    v1 [label="&", input=False, output=False];\n'
+            '    v2 [label="", shape=circle, width=0.4, height=0.4, fixedsize=true, input=False, output=False];\n'
+            '    v3 [label="~", input=False, output=False];\n\n'
+            '    {\n        rank = same;\n        v4 [label="", shape=none, input=False, output=True, color=red];\n    }\n'
+            '    v0 -> v1[color=green];\n    v1 -> v2;\n    v1 -> v2;\n    v1 -> v3;\n    v2 -> v4[color=red];\n}\n')
+
+        circuit = adders.CLA_adder(1)
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dot_writer_test.dot")
+        circuit.save_as_dot_file(path)
+        with open(path) as f:
+            saved = f.read()
+        os.remove(path)
+        for lines_per_write in [1, 7, 4096]:
+            f = io.StringIO()
+            circuit.write_dot(f, lines_per_write=lines_per_write)
+            self.assertEqual(f.getvalue(), saved)
+        self.assertEqual(saved.count(" -> "), sum(sum(n.get_children().values()) for n in circuit.get_nodes()))
+
+    def test_dot_parser(self):
+        def same(g, h):
+            self.assertEqual(g.get_inputs_ids(), h.get_inputs_ids())
+            self.assertEqual(g.get_outputs_ids(), h.get_outputs_ids())
+            self.assertEqual({n.get_id(): (n.get_label(), n.get_parents(), n.get_children()) for n in g.get_nodes()},
+                             {n.get_id(): (n.get_label(), n.get_parents(), n.get_children()) for n in h.get_nodes()})
+
+        #round trip of save_as_dot_file, multiplicities and verbose mode included
+        g = open_digraph([0],[4],[node(0,'',{},{1:1}), node(1,'&',{0:1},{2:3,3:1}), node(2,'',{1:3},{4:1}),
+                                  node(3,'~',{1:1},{}), node(4,'',{2:1},{})])
+        for verbose in [False, True]:
+            text = "".join(g.dot_lines(verbose))
+            for chunk_size in [1, 5, 1<<16]:
+                same(open_digraph.read_dot(io.StringIO(text), chunk_size), g)
+        circuit = adders.CLA_adder(1)
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dot_parser_test.dot")
+        circuit.save_as_dot_file(path)
+        loaded = adders.from_dot_file(path)
+        os.remove(path)
+        self.assertIsInstance(loaded, adders)
+        same(loaded, circuit)
+
+        #other writers : comments, ports, quoted names, chains, subgraphs and default attributes
+        text = ('/* header */ strict digraph "name" {\n  node [shape=box]; rankdir = LR\n'
+                '  a:p -> "b c":n:s -> -5 [color=red] // comment\n'
+                '  i [label="x\\"]", input=true]; # comment\n'
+                '  i -> q subgraph s { o [output=true] } q -> o; q -> z; q -> z; z -> a\n}\n')
+        for chunk_size in range(1, 12):
+            g = open_digraph.read_dot(io.StringIO(text), chunk_size)
+            self.assertEqual(g.get_inputs_ids(), [3])
+            self.assertEqual(g.get_outputs_ids(), [5])
+            self.assertEqual({n.get_id(): (n.get_label(), n.get_children()) for n in g.get_nodes()},
+                             {0: ('', {1:1}), 1: ('', {2:1}), 2: ('', {}), 3: ('x"]', {4:1}), 4: ('', {5:1, 6:2}),
+                              5: ('', {}), 6: ('', {0:1})})
+        for invalid in ['digraph { a -> }', 'digraph { a [label=x ', 'digraph { a -> b', 'digraph { a ! b }']:
+            with self.assertRaises(ValueError):
+                open_digraph.read_dot(io.StringIO(invalid))
+
+    def test_import_side_effects(self):
+        #importing the package must not print, compute, modify sys.path or load numpy
+        code = ("import sys\n"
+                "path = list(sys.path)\n"
+                "import modules.addition_checkEncode, modules.hier_circ, modules.adders\n"
+                "assert sys.path == path and 'numpy' not in sys.modules")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, "")
+        seconds, heavy = measure_import_time(repeat=1)
+        self.assertEqual(heavy, [])
+        self.assertLess(seconds, 5)
+
     def test_compose(self):
         n1 = [node(3, 'ee', {}, {4:1}) , node(4, '5', {3:1}, {5:1}),node(5, '&', {4:1}, {})]
         inp1 = [3]
@@ -370,6 +598,319 @@ class InitTest(unittest.TestCase):
         self.assertEqual(testliste2[0],gtest1)
         self.assertEqual(testliste2[1],gtest2)
 
+    def test_deep_graph(self):
+        n = 50000   #far deeper than the recursion limit
+        g = open_digraph([], [], [node(i, '', {i-1:1} if i > 0 else {}, {i+1:1} if i < n-1 else {}) for i in range(n)])
+        self.assertTrue(g.is_acyclic())
+        nb, components = g.connected_components()
+        self.assertEqual(nb, 1)
+        self.assertEqual(len(components), n)
+        g.add_node()
+        self.assertEqual(g.connected_components()[0], 2)
+        g.add_edge(n-1, 0)
+        self.assertFalse(g.is_acyclic())
+
+    def test_topological_order(self):
+        def check_order(g):
+            order = g.topo_order
+            self.assertEqual(set(order), set(g.get_node_ids()))
+            for node_id, nnode in g.get_id_node_map().items():
+                self.assertTrue(all(order[p] < order[node_id] for p in nnode.get_parents()))
+
+        random.seed(4)
+        for _ in range(20):
+            g = open_digraph.empty()
+            ids = [g.add_node() for _ in range(15)]
+            self.assertTrue(g.is_acyclic())
+            for _ in range(40):
+                u, v = random.sample(ids, 2)
+                g.add_edge(u, v)
+                if g.topo_order is None:   #the edge closed a cycle
+                    self.assertIn(u, g.dijkstra(v, direction=1)[0])
+                    self.assertFalse(g.is_acyclic())
+                    break
+                check_order(g)
+            g.remove_nodes_by_id(ids[:5])
+            if g.is_acyclic():
+                check_order(g)
+
+        circuit = adders.adder(2)
+        check_order(circuit)
+        check_order(bool_circ(circuit.copy()))
+        circuit.transform_circuit()
+        check_order(circuit)
+
+    def test_well_formedness_tracking(self):
+        g = open_digraph([0], [2], [node(0, 'a', {}, {1:1}), node(1, 'b', {0:1}, {2:1}), node(2, 'c', {1:1}, {})])
+        self.assertEqual(g.well_formedness_violations(), set())
+        g.get_node_by_id(1).add_child_id(0)   #modified behind the back of the graph
+        g.touch(1)
+        self.assertFalse(g.is_well_formed())
+        self.assertEqual(g.well_formedness_violations(), {1})
+        g.get_node_by_id(1).remove_child_id(0)
+        g.touch(1)
+        self.assertTrue(g.is_well_formed())
+
+        circuit = adders.adder(1)
+        self.assertTrue(circuit.is_well_formed())
+        a = circuit.add_and_node()
+        b = circuit.add_copy_node()
+        circuit.add_edges([(a,b), (a,b)], [])
+        self.assertFalse(circuit.is_well_formed())
+        circuit.remove_edge(a, b)
+        self.assertTrue(circuit.is_well_formed())
+        circuit.relabel(b, "x")
+        self.assertFalse(circuit.is_well_formed())
+        self.assertEqual(circuit.well_formedness_violations(), {b})
+        circuit.relabel(b, "")
+        self.assertTrue(circuit.is_well_formed())
+        circuit.debug_well_formedness = True
+        self.assertTrue(circuit.is_well_formed())
+        circuit.get_node_by_id(b).set_label("x")
+        self.assertFalse(circuit.is_well_formed())
+
+    def test_shortest_paths(self):
+        g = open_digraph([], [], [node(0, 'a', {}, {1:1, 2:3}), node(1, 'b', {0:1}, {3:3}), node(2, 'c', {0:3}, {3:1}),
+                                   node(3, 'd', {1:3, 2:1}, {4:1}), node(4, 'e', {3:1}, {})])
+        dist, prev = g.dijkstra(0, direction=1)
+        self.assertEqual(dist, {0:0, 1:1, 2:1, 3:2, 4:3})
+        dist, prev = g.dijkstra(0, direction=1, weighted=True)
+        self.assertEqual(dist, {0:0, 1:1, 2:3, 3:4, 4:5})
+        self.assertEqual(prev[3], 1)
+        self.assertEqual(g.dijkstra(4, direction=-1, weighted=True)[0][0], 5)
+        self.assertEqual(g.bidirectional_distance(0, 4, direction=1), 3)
+        self.assertEqual(g.bidirectional_distance(4, 0, direction=1), None)
+        self.assertEqual(g.shortest_path(4, 0), 3)
+
+        g = adders.CLA_adder(1)
+        ids = list(g.get_node_ids())
+        for u in ids[::17]:
+            for direction in [0,1,-1]:
+                dist = g.dijkstra(u, direction)[0]
+                for v in ids[::5]:
+                    self.assertEqual(g.bidirectional_distance(u, v, direction), dist.get(v))
+
+    def test_input_output_distances(self):
+        g = adders.CLA_adder(1)
+        distances = g.input_output_distances()
+        directed = g.input_output_distances(direction=1)
+        self.assertEqual(distances.shape, (len(g.get_inputs_ids()), len(g.get_outputs_ids())))
+        for i, inp in enumerate(g.get_inputs_ids()):
+            for j, out in enumerate(g.get_outputs_ids()):
+                self.assertEqual(distances[i,j], g.shortest_path(inp, out))
+                self.assertEqual(directed[i,j], g.dijkstra(inp, 1)[0].get(out, np.inf))
+        self.assertEqual(shortest_path_input_output(1, False), (3, 149, 148))
+
+    def test_topological_sort(self):
+        g = adders.adder(2)
+        stack = g.topological_sort()
+        inputs = g.get_inputs_ids()
+        self.assertEqual(sum(len(layer) for layer in stack), len(g.get_nodes()) - len(inputs))
+        for i, layer in enumerate(stack):
+            for node_id in layer:
+                nnode = g.get_node_by_id(node_id)
+                self.assertEqual(g.depth_node_acyclic(nnode), i+1)
+                self.assertTrue(all(p in inputs or g.depth_node_acyclic(g.get_node_by_id(p)) <= i for p in nnode.get_parents()))
+                self.assertTrue(i == 0 or any(g.depth_node_acyclic(g.get_node_by_id(p)) == i for p in nnode.get_parents()))
+        self.assertEqual(g.depth_acyclic(), len(stack))
+
+        #the cached sort is invalidated by the modifications of the graph
+        out = g.get_outputs_ids()[0]
+        new = g.add_node(parents={out:1})
+        self.assertEqual(g.depth_node_acyclic(g.get_node_by_id(new)), g.depth_node_acyclic(g.get_node_by_id(out))+1)
+        g.remove_node_by_id(new)
+        self.assertEqual(g.topological_sort(), stack)
+        g.add_edge(out, inputs[0])
+        with self.assertRaises(AssertionError):
+            g.get_inputs_ids().remove(inputs[0])
+            g.topological_sort()
+
+    def test_longest_paths(self):
+        circuit, variables = bool_circ.parse_parentheses("((x)&((y)|(~(z))))")
+        dist, prev, dist_out, next_ = circuit.longest_paths()
+        out = circuit.get_outputs_ids()[0]
+        length, path = circuit.critical_path()
+        self.assertEqual(length, 6)
+        self.assertEqual([circuit.get_node_by_id(i).get_label() for i in path], ["", "", "~", "|", "&", "", ""])
+        self.assertEqual(dist[out], 6)
+        self.assertTrue(all(dist_out[i] <= 6 for i in circuit.get_inputs_ids()))
+        self.assertEqual(dist_out[path[0]], 6)
+        self.assertEqual(next_[path[0]], path[1])
+        self.assertEqual(prev[out], path[-2])
+
+        #only the gates take time
+        length, path = circuit.critical_path({"":0, "~":1, "|":2, "&":2})
+        self.assertEqual(length, 5)
+        self.assertEqual(circuit.critical_path({"":0, "~":0})[0], 2)
+
+        g = adders.adder(2)
+        dist, prev, dist_out, next_ = g.longest_paths()
+        for w, d in dist.items():
+            if w not in g.get_inputs_ids():
+                self.assertEqual(d, max(dist[p] for p in g.get_node_by_id(w).get_parents() if p in dist)+1)
+        self.assertEqual(g.critical_path()[0], max(dist_out[i] for i in g.get_inputs_ids()))
+
+    def test_freeze(self):
+        g = adders.adder(2)
+        f = g.freeze()
+        slots = g.id_map()
+        self.assertEqual(len(f), len(g.get_nodes()))
+        self.assertEqual(f.get_inputs_ids(), g.get_inputs_ids())
+        self.assertEqual(f.get_outputs_ids(), g.get_outputs_ids())
+        for node_id, s in slots.items():
+            nnode = g.get_node_by_id(node_id)
+            self.assertEqual(f.ids[s], node_id)
+            self.assertEqual(f.ops[s], nnode.op)
+            self.assertEqual(sorted(f.ids[f.get_children_slots(s)].tolist()), sorted(nnode.get_children()))
+            self.assertEqual(sorted(f.ids[f.get_parents_slots(s)].tolist()), sorted(nnode.get_parents()))
+        with self.assertRaises(ValueError):
+            f.children_indices[0] = 0
+
+        self.assertEqual([sorted(layer) for layer in f.topological_sort()], [sorted(layer) for layer in g.topological_sort()])
+        self.assertEqual(f.connected_components(), g.connected_components())
+        self.assertTrue(f.is_acyclic())
+        src = g.get_inputs_ids()[0]
+        for direction in [0,1,-1]:
+            self.assertEqual(f.dijkstra(src, direction)[0], g.dijkstra(src, direction)[0])
+            self.assertEqual(f.dijkstra(src, direction, weighted=True)[0], g.dijkstra(src, direction, weighted=True)[0])
+        self.assertIs(f.adjacency_lists(0), f.adjacency_lists(0))   #built once
+        cyclic = open_digraph([], [], [node(0, 'a', {1:1}, {1:1}), node(1, 'b', {0:1}, {0:1})])
+        self.assertFalse(cyclic.freeze().is_acyclic())
+
+    def test_compile(self):
+        enc = bool_circ.encodeur_4bits()
+        dec = bool_circ.decodeur_7bits()
+        g = bool_circ(bool_circ.compose(dec,bool_circ.compose(bool_circ.perturbe_bit(7,[2]),enc)))
+        nb_nodes = len(g.get_nodes())
+        compiled = g.compile()
+        for i in range(16):
+            bits = bool_circ.convert_to_binary_string(i,size=4)
+            self.assertEqual(bool_circ.convert_bits_to_int(compiled.evaluate(bits)), i)
+            self.assertEqual(g.evaluate(bits), [int(b) for b in bits])
+        self.assertEqual(len(g.get_nodes()), nb_nodes)   #the circuit is left untouched
+
+        circuit = bool_circ.empty_bool_circ()
+        and_id = circuit.add_and_node()
+        circuit.add_output_node(and_id)
+        self.assertEqual(circuit.evaluate([]), [1])   #neutral element of a gate without parents
+        with self.assertRaises(AssertionError) as context:
+            compiled.evaluate([0,1])
+        self.assertEqual(str(context.exception), "error, domains don't match.")
+
+    def test_evaluate_many(self):
+        g = adders.adder(2)
+        compiled = g.compile()
+        vectors = [[random.randint(0,1) for _ in g.get_inputs_ids()] for _ in range(200)]
+        self.assertEqual(compiled.evaluate_many(vectors), [compiled.evaluate(v) for v in vectors])
+        strings = ["".join(str(b) for b in v) for v in vectors]
+        self.assertEqual(g.evaluate_many(strings), [compiled.evaluate(v) for v in vectors])
+
+        #bit j of an input word is the value of the input in the j-th pattern
+        words = [int("".join(str(v[i]) for v in reversed(vectors[:64])), 2) for i in range(len(vectors[0]))]
+        outputs = compiled.evaluate_packed(words)
+        for j in range(64):
+            self.assertEqual([(w >> j) & 1 for w in outputs], compiled.evaluate(vectors[j]))
+
+    def test_evaluate_batch(self):
+        g = adders.adder(3)
+        compiled = g.compile()
+        X = np.random.randint(0,2,(130,len(g.get_inputs_ids()))).astype(np.uint8)
+        Y = g.evaluate_batch(X)
+        self.assertEqual(Y.shape, (130,len(g.get_outputs_ids())))
+        self.assertEqual(Y.tolist(), [compiled.evaluate(x) for x in X.tolist()])
+        self.assertEqual(compiled.evaluate_batch(X.astype(bool)).tolist(), Y.astype(bool).tolist())
+
+    def test_transform_circuit(self):
+        for n in [40,80,120]:
+            circuit = bool_circ.random_circ_bool(n,8,8)
+            X = np.random.randint(0,2,(64,8)).astype(np.uint8)
+            before = circuit.evaluate_batch(X)
+            circuit.transform_circuit()
+            self.assertEqual(circuit.evaluate_batch(X).tolist(), before.tolist())
+            nb_nodes = len(circuit.get_nodes())
+            circuit.transform_circuit()   #the fixpoint is reached
+            self.assertEqual(len(circuit.get_nodes()), nb_nodes)
+
+        #copy chains between gates
+        circuit = adders.adder(2)
+        X = np.random.randint(0,2,(64,len(circuit.get_inputs_ids()))).astype(np.uint8)
+        before = circuit.evaluate_batch(X)
+        circuit.transform_circuit()
+        self.assertTrue(circuit.is_well_formed())
+        self.assertEqual(circuit.evaluate_batch(X).tolist(), before.tolist())
+
+        #x & (x | y) = x
+        circuit, variables = bool_circ.parse_parentheses("((x)&((x)|(y)))")
+        circuit.transform_circuit()
+        self.assertEqual(sorted(n.get_label() for n in circuit.get_nodes() if n.get_label() != ""), ["&"])
+        self.assertEqual([circuit.evaluate([x,y]) for x in [0,1] for y in [0,1]], [[0],[0],[1],[1]])
+
+        #x ^ x = 0 once the copy and xor gates are merged
+        circuit, variables = bool_circ.parse_parentheses("((x)^((x)^(y)))")
+        circuit.transform_circuit()
+        self.assertEqual([circuit.evaluate([x,y]) for x in [0,1] for y in [0,1]], [[0],[1],[0],[1]])
+
+    def test_rule_instrumentation(self):
+        circuit = adders.adder(3)
+        circuit.icompose(bool_circ.create_registre(0b10110100101110011, size=17))
+        expected = circuit.copy().calculate()
+        nb_nodes, nb_edges = len(circuit.get_nodes()), count_edges(circuit)
+        calls = []
+        report = circuit.start_instrumentation(hook=lambda name, ids, fired: calls.append((name, fired)))
+        circuit.transform_circuit()
+        self.assertIs(circuit.stop_instrumentation(), report)
+        self.assertIsNone(circuit.rule_stats)
+        self.assertIsNone(circuit.edge_balance)
+        self.assertEqual(bool_circ.effacement.__qualname__, "bool_circ_gates_mx.effacement")
+        self.assertEqual(bool_circ.effacement.__wrapped__.__module__, bool_circ.effacement.__module__)
+
+        rules = report["rules"]
+        self.assertEqual((report["runs"], report["visits"] > 0), (1, True))
+        self.assertEqual(sum(c["nodes_removed"] for c in rules.values()), nb_nodes - len(circuit.get_nodes()))
+        self.assertEqual(sum(c["edges_removed"] for c in rules.values()), nb_edges - count_edges(circuit))
+        self.assertEqual(len(calls), sum(c["attempts"] for c in rules.values()))
+        self.assertEqual(sum(fired for _, fired in calls), sum(c["fired"] for c in rules.values()))
+        self.assertTrue(all(c["fired"] <= c["attempts"] for c in rules.values()))
+        self.assertTrue(sum(c["time"] for c in rules.values()) <= report["time"])
+        self.assertEqual(circuit.evaluate(), expected)
+
+        #the reports of several circuits can be added, nested rules are counted by the rule calling them
+        effacements = rules.get("effacement", {}).get("fired", 0)
+        circuit, variables = bool_circ.parse_parentheses("((x)&((x)|(y)))")
+        circuit.start_instrumentation(report)
+        circuit.transform_circuit()
+        circuit.stop_instrumentation()
+        self.assertEqual((report["runs"], report["rules"]["absoroption_and"]["fired"]), (2, 1))
+        self.assertEqual(report["rules"].get("effacement", {}).get("fired", 0), effacements)
+
+    def test_strash(self):
+        circuit, variables = bool_circ.parse_parentheses("((x)&(y))","((y)&(x))","(((x)&(y))|((y)&(x)))","((~(x))^(~(x)))")
+        X = np.array([[0,0],[0,1],[1,0],[1,1]], dtype=np.uint8)
+        before = circuit.evaluate_batch(X)
+        self.assertTrue(circuit.strash() > 0)
+        self.assertTrue(circuit.is_well_formed())
+        self.assertEqual(circuit.evaluate_batch(X).tolist(), before.tolist())
+        labels = [n.get_label() for n in circuit.get_nodes()]
+        self.assertEqual(labels.count("&"), 1)
+        self.assertEqual(labels.count("~"), 1)
+        self.assertEqual(circuit.strash(), 0)
+
+        #construction mode
+        circuit = bool_circ.empty_bool_circ()
+        circuit.start_hashing()
+        x = circuit.add_copy_node()
+        y = circuit.add_copy_node()
+        circuit.set_inputs([x,y])
+        a = circuit.add_and_node({x:1,y:1})
+        self.assertEqual(circuit.add_and_node({y:1,x:1}), a)
+        self.assertNotEqual(circuit.add_or_node({x:1,y:1}), a)
+        circuit.add_output_node(circuit.add_xor_node({a:1,x:1}))
+        circuit.add_output_node(circuit.add_xor_node({x:1,a:1}))
+        circuit.stop_hashing()
+        self.assertEqual([n.get_label() for n in circuit.get_nodes()].count("^"), 1)
+        self.assertTrue(circuit.is_well_formed())
+        self.assertEqual(circuit.evaluate([1,0]), [1,1])
+
     def test_adders(self):
         i = 0
         res = True